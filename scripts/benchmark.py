@@ -0,0 +1,144 @@
+"""
+benchmark.py
+
+Benchmark de escalado sobre datos sintéticos (synthetic.py).
+
+Para cada factor de escala genera un set de CSVs (jugadores y partidos por año
+multiplicados por el factor) en un directorio temporal y mide:
+- load: load_matches / load_rankings + build_rank_hist
+- replay:<backend>: el replay online completo de build_dataset
+- rank_delta: rank_delta_weeks (escalar, por partido) vs rank_delta_weeks_array
+- trackers: forma (RollingWindowStore), fatiga y carga del torneo sobre el stream
+
+Uso:
+    python benchmark.py --scales 1,5,10 --years 5
+    python benchmark.py --scales 2 --career-years 4,8,16   # profundidad de historia
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from build_dataset import DEFAULT_FEATURES, build_dataset
+from download import load_matches
+from features_fatigue import matches_last_days, update_fatigue_post_match
+from features_form import new_win_hist, update_form_post_match, winrate_last
+from features_tourney import TourneyLoadTracker
+from rankings import build_rank_hist, build_rank_index, load_rankings, rank_delta_weeks, rank_delta_weeks_array
+from synthetic import SyntheticConfig, generate
+from utils import load_players_lookup
+
+
+def _timed(fn: Callable[[], object]):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _trackers(df: pd.DataFrame) -> None:
+    """Pre-match + post-match de los trackers con historia por jugador, sin el resto del replay."""
+    win_hist = new_win_hist()
+    streak: Dict[int, int] = {}
+    last_date: Dict = {}
+    match_dates: Dict = {}
+    tourney = TourneyLoadTracker()
+
+    for date, tid, w, l in zip(df["tourney_date"], df["tourney_id"].astype(str), df["winner_id"], df["loser_id"]):
+        tourney.advance(date)
+        for pid in (w, l):
+            winrate_last(win_hist, pid, 20)
+            matches_last_days(match_dates, pid, date, 30)
+            tourney.matches_so_far(tid, pid)
+        update_form_post_match(win_hist, streak, w, l)
+        update_fatigue_post_match(last_date, match_dates, w, l, date)
+        tourney.update_post_match(tid, date, w, l, np.nan)
+
+
+def run_case(cfg: SyntheticConfig, backends: List[str], rank_sample: int) -> List[dict]:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp)
+        counts, t_gen = _timed(lambda: generate(cfg, raw))
+
+        def row(stage: str, seconds: float, n: int) -> None:
+            rows.append({
+                "players": cfg.n_players,
+                "matches": counts["matches"],
+                "career_years": cfg.career_years,
+                "stage": stage,
+                "seconds": round(seconds, 3),
+                "us_per_item": round(1e6 * seconds / max(n, 1), 2),
+            })
+
+        row("generate", t_gen, counts["matches"])
+
+        df, t = _timed(lambda: load_matches(cfg.year_from, cfg.year_to, raw_dir=raw))
+        row("load:matches", t, len(df))
+        rank_hist, t = _timed(lambda: build_rank_hist(load_rankings(cfg.year_from, cfg.year_to, raw_dir=raw)))
+        row("load:rankings", t, counts["rankings"])
+        players = load_players_lookup(raw)
+
+        for backend in backends:
+            _, t = _timed(lambda: build_dataset(df, None, players, rank_hist, seed=7, features=DEFAULT_FEATURES, backend=backend))
+            row(f"replay:{backend}", t, len(df))
+
+        # rank deltas: escalar sobre una muestra vs vectorizado sobre todos los partidos
+        sample = df.sample(min(rank_sample, len(df)), random_state=0)
+        _, t = _timed(lambda: [
+            rank_delta_weeks(rank_hist.get(pid, []), date, 4)
+            for pid, date in zip(sample["winner_id"], sample["tourney_date"])
+        ])
+        row("rank_delta:scalar", t, len(sample))
+
+        days = np.asarray(pd.DatetimeIndex(df["tourney_date"]), dtype="datetime64[D]").astype(np.int64)
+        pids = df["winner_id"].to_numpy(dtype=np.int64)
+        index, t_index = _timed(lambda: build_rank_index(rank_hist))
+        _, t = _timed(lambda: rank_delta_weeks_array(index, pids, days, 4))
+        row("rank_delta:array", t_index + t, len(df))
+
+        _, t = _timed(lambda: _trackers(df))
+        row("trackers", t, len(df))
+    return rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Escalado del pipeline sobre datos sintéticos.")
+    ap.add_argument("--scales", type=str, default="1,2,5", help="Factores sobre --players / --matches-per-year.")
+    ap.add_argument("--players", type=int, default=SyntheticConfig.n_players)
+    ap.add_argument("--matches-per-year", type=int, default=SyntheticConfig.matches_per_year)
+    ap.add_argument("--years", type=int, default=5)
+    ap.add_argument("--career-years", type=str, default=str(SyntheticConfig.career_years))
+    ap.add_argument("--backends", type=str, default="jit", help="Backends del replay a medir (python,jit).")
+    ap.add_argument("--rank-sample", type=int, default=5000)
+    ap.add_argument("--out", type=Path, default=None, help="CSV con los resultados.")
+    args = ap.parse_args()
+
+    backends = [b for b in args.backends.split(",") if b]
+    rows = []
+    for scale in [float(s) for s in args.scales.split(",")]:
+        for career in [float(c) for c in args.career_years.split(",")]:
+            cfg = SyntheticConfig(
+                year_from=2024 - args.years + 1,
+                year_to=2024,
+                n_players=int(args.players * scale),
+                matches_per_year=int(args.matches_per_year * scale),
+                career_years=career,
+            )
+            case = run_case(cfg, backends, args.rank_sample)
+            rows += case
+            print(pd.DataFrame(case).to_string(index=False), flush=True)
+
+    if args.out is not None:
+        pd.DataFrame(rows).to_csv(args.out, index=False)
+        print(f"Resultados: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
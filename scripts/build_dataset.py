@@ -13,21 +13,89 @@ usando el repo JeffSackmann/tennis_atp.
 from __future__ import annotations
 
 import argparse
-import random
-from typing import Dict, List, Tuple, Optional
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 
 from utils import PROCESSED_DIR, load_players_lookup
-from download import ensure_atp_data, load_matches
-from elo import EloState, SURFACES
+from cache import DEFAULT_MAX_MB, StageCache
+from download import CIRCUITS, Circuit, ensure_circuit_data, get_circuit, load_matches
+from elo import ELO_BACKENDS, SURFACES, make_elo_state
+from glicko import Glicko2State
 from rankings import load_rankings, build_rank_hist, rank_delta_weeks
 
-from features_form import winrate_last, get_streak, update_form_post_match
+from features_form import new_win_hist, winrate_last, get_streak, update_form_post_match
 from features_fatigue import rest_days, matches_last_days, update_fatigue_post_match
-from features_stats import stat_avg, update_stats_post_match
+from features_tourney import TourneyLoadTracker
+from features_stats import STAT_METRICS, new_stats_hist, stat_avgs, update_stats_post_match
+from rolling import surface_key, level_key
 from h2h import h2h_pre_match, h2h_surface_pre_match, update_h2h_post_match
+from symmetry import entry_strings, orientations, symmetrize
+from snapshots import SnapshotRecorder
+from validation import ValidationReport
+
+
+# Features por lado (ganador / perdedor) de cada grupo seleccionable (--features).
+# Cada una sale como <feature>_diff = P1 - P2. h2h es una feature del par.
+# Las columnas de contexto (ids, fecha, superficie, ronda, seed/entry, target) se emiten siempre.
+SIDE_FEATURES: Dict[str, Tuple[str, ...]] = {
+    "player": ("age", "height", "lefty"),
+    "elo": ("elo", "surface_elo"),
+    "glicko": ("glicko", "glicko_rd"),
+    "rank": ("rank", "rank_points", "rank_d4", "rank_points_d4", "rank_d8", "rank_points_d8"),
+    "form": ("wr10", "wr20", "streak", "wr20_surface", "wr20_level"),
+    "fatigue": ("rest", "m7", "m14", "m30"),
+    "tourney": ("tourney_matches_so_far", "tourney_minutes_so_far"),
+    "h2h": (),
+    "stats": STAT_METRICS + tuple(f"{m}_surface" for m in STAT_METRICS),
+}
+PAIR_FEATURES: Dict[str, Tuple[str, ...]] = {"h2h": ("h2h", "h2h_surface")}
+
+CONTEXT_COLUMNS = ("date", "tourney_id", "tourney_level", "surface", "round", "best_of")
+
+FEATURE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    g: tuple(f"{f}_diff" for f in sides + PAIR_FEATURES.get(g, ()))
+    + (("p1_lefty", "p2_lefty") if g == "player" else ())
+    for g, sides in SIDE_FEATURES.items()
+}
+
+# Grupos opt-in: no entran en el default, hay que pedirlos con --features
+OPTIONAL_GROUPS = ("glicko",)
+DEFAULT_FEATURES = tuple(g for g in FEATURE_GROUPS if g not in OPTIONAL_GROUPS)
+
+
+def _output_spec(use) -> List[Tuple[str, str, str]]:
+    """Columnas de salida en orden, como (columna, tipo, fuente) para symmetry.symmetrize."""
+    spec = [(c, "ctx", c) for c in CONTEXT_COLUMNS]
+    spec += [("p1_id", "p1", "id"), ("p2_id", "p2", "id"), ("y_p1_win", "y", "")]
+    for g, sides in SIDE_FEATURES.items():
+        if g not in use:
+            continue
+        spec += [(f"{f}_diff", "diff", f) for f in sides]
+        spec += [(f"{f}_diff", "pair", f) for f in PAIR_FEATURES.get(g, ())]
+        if g == "player":
+            spec += [("p1_lefty", "p1", "lefty"), ("p2_lefty", "p2", "lefty")]
+    spec += [("seed_diff", "diff", "seed"), ("entry_p1", "p1", "entry"), ("entry_p2", "p2", "entry")]
+    return spec
+
+
+def parse_features(spec: Optional[str]) -> Tuple[str, ...]:
+    """'elo,rank' -> ('elo', 'rank'); None -> DEFAULT_FEATURES; 'all' -> todos los grupos."""
+    if spec is None:
+        return DEFAULT_FEATURES
+    if spec.strip() == "all":
+        return tuple(FEATURE_GROUPS)
+    groups = tuple(g.strip() for g in spec.split(",") if g.strip())
+    unknown = [g for g in groups if g not in FEATURE_GROUPS]
+    if unknown:
+        raise ValueError(f"Grupos de features desconocidos: {unknown} (opciones: {list(FEATURE_GROUPS)})")
+    return groups
 
 
 def _to_float(x) -> float:
@@ -40,6 +108,15 @@ def _to_float(x) -> float:
     except Exception:
         return np.nan
 
+
+def _deferred_quals(df: Optional[pd.DataFrame]) -> Iterator[Tuple[pd.Timestamp, str, int, int, float]]:
+    """(fecha, tourney_id, w, l, minutos) de las qualies, en orden, sin materializar una lista aparte."""
+    if df is None or df.empty:
+        return
+    minutes = df["minutes"] if "minutes" in df else pd.Series(np.nan, index=df.index)
+    for date, tid, w, l, m in zip(df["tourney_date"], df["tourney_id"].astype(str), df["winner_id"], df["loser_id"], minutes):
+        yield date, tid, int(w), int(l), _to_float(m)
+
 def _rank_deltas_for_player(rank_hist, pid: int, date: pd.Timestamp, weeks_list=(4, 8)):
     """
     Devuelve dict con deltas de rank y rank_points vs semanas atrás.
@@ -53,6 +130,13 @@ def _rank_deltas_for_player(rank_hist, pid: int, date: pd.Timestamp, weeks_list=
         out[f"rp_d{w}"] = _to_float(dp)
     return out
 
+
+# Resultado del replay: (context, winner, loser, pair), columnas alineadas por partido del main draw
+ReplayColumns = Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray]]
+
+BACKENDS = ("python", "jit")
+
+
 def build_dataset(
     df_main: pd.DataFrame,
     df_qual_for_updates: Optional[pd.DataFrame],
@@ -62,28 +146,110 @@ def build_dataset(
     default_rank_impute: int = 2000,
     default_rp_impute: int = 0,
     roll_n: int = 20,
+    elo_backend: str = "fast",
+    features: Optional[Tuple[str, ...]] = None,
+    mirror: bool = False,
+    snapshots: Optional[SnapshotRecorder] = None,
+    backend: str = "python",
 ) -> pd.DataFrame:
     """
     Construye dataset PRE-MATCH (clasificación) evitando data leakage:
     - todo se calcula online (en orden temporal)
     - updates post-match: Elo, rolling stats, forma, fatiga, H2H, carga del torneo
+
+    `features` elige los grupos de FEATURE_GROUPS; los grupos apagados no
+    calculan nada pre-match ni mantienen estado post-match.
+
+    El replay solo guarda columnas del lado ganador / perdedor; el swap P1/P2 y
+    los *_diff se arman después en symmetry (mirror=True emite ambas orientaciones).
+
+    backend="python" es la implementación de referencia (replay_online);
+    backend="jit" corre el loop sobre arrays codificados (fast_loop.py, Numba si está instalado).
+
+    Si se pasa `snapshots`, se registra el estado de los jugadores periódicamente
+    durante el replay del main draw (ver snapshots.py).
     """
+    use = set(DEFAULT_FEATURES if features is None else features)
+
+    if backend == "jit":
+        if snapshots is not None:
+            raise ValueError("Los snapshots solo están soportados con backend='python'.")
+        from fast_loop import replay_arrays
+
+        context, winner, loser, pair = replay_arrays(
+            df_main, df_qual_for_updates, players_lookup, rank_hist, use,
+            default_rank_impute=default_rank_impute,
+            default_rp_impute=default_rp_impute,
+            roll_n=roll_n,
+        )
+    elif backend == "python":
+        context, winner, loser, pair = replay_online(
+            df_main, df_qual_for_updates, players_lookup, rank_hist, use,
+            default_rank_impute=default_rank_impute,
+            default_rp_impute=default_rp_impute,
+            roll_n=roll_n,
+            elo_backend=elo_backend,
+            snapshots=snapshots,
+        )
+    else:
+        raise ValueError(f"Backend desconocido: {backend!r} (opciones: {BACKENDS})")
 
-    random.seed(seed)
-    np.random.seed(seed)
+    # Swap P1/P2 + diffs, vectorizado
+    idx, p1_is_winner = orientations(len(winner["id"]), seed, mirror=mirror)
+    cols = symmetrize(_output_spec(use), context, winner, loser, pair, idx, p1_is_winner)
 
-    elo = EloState()
+    out = pd.DataFrame(cols)
+    out["surface"] = out["surface"].fillna("Unknown")
+    out["round"] = out["round"].fillna("UNK")
+    out["tourney_level"] = out["tourney_level"].fillna("UNK")
+    return out
+
+
+def replay_online(
+    df_main: pd.DataFrame,
+    df_qual_for_updates: Optional[pd.DataFrame],
+    players_lookup: Dict[int, dict],
+    rank_hist: Dict[int, List[Tuple[pd.Timestamp, int, int]]],
+    use,
+    default_rank_impute: int = 2000,
+    default_rp_impute: int = 0,
+    roll_n: int = 20,
+    elo_backend: str = "fast",
+    snapshots: Optional[SnapshotRecorder] = None,
+) -> ReplayColumns:
+    """
+    Replay cronológico de referencia: features pre-match por lado (w / l)
+    de cada partido del main draw, updates post-match con el resultado real.
+    """
+    use_elo = "elo" in use
+    use_glicko = "glicko" in use
+    use_form = "form" in use
+    use_fatigue = "fatigue" in use
+    use_h2h = "h2h" in use
+    use_stats = "stats" in use
+    use_tourney = "tourney" in use
+    use_rank = "rank" in use
+    use_player = "player" in use
+    # el decay de Elo necesita la fecha del último partido aunque fatiga esté apagada
+    track_last_date = use_elo or use_fatigue
+
+    elo = make_elo_state(elo_backend)
+    glicko = Glicko2State()
 
     # Trackers online
     last_date: Dict[int, pd.Timestamp] = {}
     match_dates: Dict[int, List[pd.Timestamp]] = {}
-    win_hist: Dict[int, List[int]] = {}
+    win_hist = new_win_hist()
     streak: Dict[int, int] = {}
     h2h_global: Dict[Tuple[int, int], int] = {}
     h2h_surface: Dict[Tuple[str, int, int], int] = {}
-    stats_hist: Dict[int, Dict[str, List[float]]] = {}
-    tourney_matches: Dict[Tuple[str, int], int] = {}
-    tourney_minutes: Dict[Tuple[str, int], int] = {}
+    stats_hist = new_stats_hist(window=roll_n)
+    tourney_load = TourneyLoadTracker()
+    # Glicko y carga del torneo toman las qualies recién en el loop del main draw, en orden
+    # cronológico: cada una cae en su período de Glicko y en un torneo todavía abierto
+    # (así el tracker no acumula de entrada los torneos de toda la historia).
+    deferred_quals = _deferred_quals(df_qual_for_updates) if use_glicko or use_tourney else iter(())
+    next_qual = next(deferred_quals, None)
 
     def post_match_update(
         r: pd.Series,
@@ -93,26 +259,59 @@ def build_dataset(
         level: str,
         surface: str,
         tid: str,
+        qual: bool = False,
     ) -> None:
         # Elo: surface-specific solo si la surface es estándar
         elo_surface = surface if surface in SURFACES else None
-        elo.update(winner=winner, loser=loser, level=level, surface=elo_surface)
-
-        update_fatigue_post_match(last_date, match_dates, winner, loser, date)
-        update_form_post_match(win_hist, streak, winner, loser)
-        update_h2h_post_match(h2h_global, h2h_surface, surface, winner, loser)
-        update_stats_post_match(stats_hist, winner, loser, r)
+        if use_elo:
+            elo.update(winner=winner, loser=loser, level=level, surface=elo_surface)
+        if use_glicko and not qual:
+            glicko.add_match(winner, loser)
+
+        if use_fatigue:
+            update_fatigue_post_match(last_date, match_dates, winner, loser, date)
+        elif track_last_date:
+            last_date[winner] = date
+            last_date[loser] = date
+        if use_form:
+            update_form_post_match(win_hist, streak, winner, loser, surface=elo_surface, level=level)
+        if use_h2h:
+            update_h2h_post_match(h2h_global, h2h_surface, surface, winner, loser)
+        if use_stats:
+            update_stats_post_match(stats_hist, winner, loser, r, surface=elo_surface)
 
         # Carga del torneo (pre-match se lee, post-match se incrementa)
-        tourney_matches[(tid, winner)] = tourney_matches.get((tid, winner), 0) + 1
-        tourney_matches[(tid, loser)] = tourney_matches.get((tid, loser), 0) + 1
-
-        minutes = _to_float(r.get("minutes"))
-        if not np.isnan(minutes):
-            tourney_minutes[(tid, winner)] = tourney_minutes.get((tid, winner), 0) + int(minutes)
-            tourney_minutes[(tid, loser)] = tourney_minutes.get((tid, loser), 0) + int(minutes)
+        if use_tourney and not qual:
+            tourney_load.update_post_match(tid, date, winner, loser, _to_float(r.get("minutes")))
+
+        # las qualies del pase inicial no son cronológicas: no generan deltas de snapshot
+        if snapshots is not None and not qual:
+            snapshots.record_match(winner, date, _snapshot_state(winner))
+            snapshots.record_match(loser, date, _snapshot_state(loser))
+
+    nan = np.nan
+    snapshot_surfaces = sorted(SURFACES)
+
+    def _snapshot_state(pid: int) -> tuple:
+        """Fila en el orden de snapshots.SNAPSHOT_COLUMNS (NaN para grupos apagados)."""
+        if use_elo:
+            elo_part = (elo.get(pid),) + tuple(elo.get(pid, s) for s in snapshot_surfaces)
+            elo_part += (elo.matches_played.get(pid, 0),)
+        else:
+            elo_part = (nan,) * (len(snapshot_surfaces) + 2)
+        if use_form:
+            form_part = (get_streak(streak, pid), winrate_last(win_hist, pid, 10), winrate_last(win_hist, pid, 20))
+        else:
+            form_part = (nan,) * 3
+        if use_stats:
+            stats_part = tuple(stat_avgs(stats_hist, pid, n=roll_n).values())
+        else:
+            stats_part = (nan,) * len(STAT_METRICS)
+        return elo_part + form_part + stats_part
 
     # 0) Qualies: SOLO updates (no filas)
+    # Glicko y tourney_load no se tocan acá (ver deferred_quals): el stream de qualies
+    # no es cronológico respecto del main.
     if df_qual_for_updates is not None and not df_qual_for_updates.empty:
         for _, r in df_qual_for_updates.iterrows():
             date = r["tourney_date"]
@@ -122,15 +321,20 @@ def build_dataset(
             level = str(r.get("tourney_level") or "UNK")
             tid = str(r.get("tourney_id"))
 
-            w_rest = rest_days(last_date, w, date)
-            l_rest = rest_days(last_date, l, date)
-            elo.decay_if_needed(w, w_rest)
-            elo.decay_if_needed(l, l_rest)
+            if use_elo:
+                elo.decay_if_needed(w, rest_days(last_date, w, date))
+                elo.decay_if_needed(l, rest_days(last_date, l, date))
 
-            post_match_update(r, date, w, l, level, surface, tid)
+            post_match_update(r, date, w, l, level, surface, tid, qual=True)
 
-    # 1) Main draw: genera filas
-    rows: List[dict] = []
+    # 1) Main draw: guarda features por lado (w / l); las filas se arman al final
+    ctx_rows: List[tuple] = []
+    ids: List[Tuple[int, int]] = []
+    seeds: List[Tuple[float, float]] = []
+    entries: List[tuple] = []
+    w_rec: Dict[str, List[tuple]] = {g: [] for g in SIDE_FEATURES}
+    l_rec: Dict[str, List[tuple]] = {g: [] for g in SIDE_FEATURES}
+    pair_rec: Dict[str, List[tuple]] = {g: [] for g in PAIR_FEATURES}
 
     def _player_age(pid: int, date: pd.Timestamp) -> float:
         info = players_lookup.get(pid)
@@ -157,263 +361,318 @@ def build_dataset(
             return np.nan
         return 1.0 if hand == "L" else 0.0
 
+    no_surface_stats = (0.0,) * len(STAT_METRICS)
+
     for _, r in df_main.iterrows():
         date = r["tourney_date"]
         w = int(r["winner_id"])
         l = int(r["loser_id"])
 
-        w_age = _player_age(w, date)
-        l_age = _player_age(l, date)
-
-        w_height = _player_height(w)
-        l_height = _player_height(l)
-
-        w_lefty = _player_lefty(w)
-        l_lefty = _player_lefty(l)
-
         surface = r.get("surface") if pd.notna(r.get("surface")) else "Unknown"
         level = str(r.get("tourney_level") or "UNK")
         tid = str(r.get("tourney_id"))
+        std_surface = surface if surface in SURFACES else None
 
         round_ = r.get("round") if pd.notna(r.get("round")) else "UNK"
         best_of = _to_float(r.get("best_of"))
 
-        # Decay pre-match
-        w_rest = rest_days(last_date, w, date)
-        l_rest = rest_days(last_date, l, date)
-        elo.decay_if_needed(w, w_rest)
-        elo.decay_if_needed(l, l_rest)
-
-        # Elo pre-match
-        w_elo = elo.get(w)
-        l_elo = elo.get(l)
-        w_selo = elo.get(w, surface if surface in SURFACES else None)
-        l_selo = elo.get(l, surface if surface in SURFACES else None)
-
-        # Forma pre-match
-        w_wr10 = winrate_last(win_hist, w, 10)
-        l_wr10 = winrate_last(win_hist, l, 10)
-        w_wr20 = winrate_last(win_hist, w, 20)
-        l_wr20 = winrate_last(win_hist, l, 20)
-        w_st = get_streak(streak, w)
-        l_st = get_streak(streak, l)
-
-        # Fatiga pre-match
-        w_m7 = matches_last_days(match_dates, w, date, 7)
-        l_m7 = matches_last_days(match_dates, l, date, 7)
-        w_m14 = matches_last_days(match_dates, w, date, 14)
-        l_m14 = matches_last_days(match_dates, l, date, 14)
-        w_m30 = matches_last_days(match_dates, w, date, 30)
-        l_m30 = matches_last_days(match_dates, l, date, 30)
-
-        # Carga del torneo pre-match
-        w_tms = tourney_matches.get((tid, w), 0)
-        l_tms = tourney_matches.get((tid, l), 0)
-        w_tmin = tourney_minutes.get((tid, w), 0)
-        l_tmin = tourney_minutes.get((tid, l), 0)
-
-        # H2H pre-match (w vs l)
-        wl_h2h = h2h_pre_match(h2h_global, w, l)
-        wl_h2h_s = h2h_surface_pre_match(h2h_surface, surface, w, l)
-
-        # Rankings desde el match file (imputados)
-        w_rank = _to_float(r.get("winner_rank"))
-        l_rank = _to_float(r.get("loser_rank"))
-        w_rp = _to_float(r.get("winner_rank_points"))
-        l_rp = _to_float(r.get("loser_rank_points"))
-
-        if np.isnan(w_rank):
-            w_rank = float(default_rank_impute)
-        if np.isnan(l_rank):
-            l_rank = float(default_rank_impute)
-        if np.isnan(w_rp):
-            w_rp = float(default_rp_impute)
-        if np.isnan(l_rp):
-            l_rp = float(default_rp_impute)
-
-        # Deltas ranking (4/8 semanas) desde rank_hist
-        w_d = _rank_deltas_for_player(rank_hist, w, date, weeks_list=(4, 8))
-        l_d = _rank_deltas_for_player(rank_hist, l, date, weeks_list=(4, 8))
-
-        w_rank_d4, w_rp_d4 = w_d["rank_d4"], w_d["rp_d4"]
-        w_rank_d8, w_rp_d8 = w_d["rank_d8"], w_d["rp_d8"]
-
-        l_rank_d4, l_rp_d4 = l_d["rank_d4"], l_d["rp_d4"]
-        l_rank_d8, l_rp_d8 = l_d["rank_d8"], l_d["rp_d8"]
-
-        # Seed/entry
-        w_entry, l_entry = r.get("winner_entry"), r.get("loser_entry")
-        w_seed = _to_float(r.get("winner_seed"))
-        l_seed = _to_float(r.get("loser_seed"))
-
-        # Stats rolling pre-match
-        w_ace = stat_avg(stats_hist, w, "ace_rate", n=roll_n)
-        l_ace = stat_avg(stats_hist, l, "ace_rate", n=roll_n)
-        w_df = stat_avg(stats_hist, w, "df_rate", n=roll_n)
-        l_df = stat_avg(stats_hist, l, "df_rate", n=roll_n)
-        w_1stin = stat_avg(stats_hist, w, "first_in_rate", n=roll_n)
-        l_1stin = stat_avg(stats_hist, l, "first_in_rate", n=roll_n)
-        w_1stwon = stat_avg(stats_hist, w, "first_won_rate", n=roll_n)
-        l_1stwon = stat_avg(stats_hist, l, "first_won_rate", n=roll_n)
-        w_2ndwon = stat_avg(stats_hist, w, "second_won_rate", n=roll_n)
-        l_2ndwon = stat_avg(stats_hist, l, "second_won_rate", n=roll_n)
-        w_bps = stat_avg(stats_hist, w, "bp_saved_rate", n=roll_n)
-        l_bps = stat_avg(stats_hist, l, "bp_saved_rate", n=roll_n)
-
-        # Random swap (simetría)
-        if random.random() < 0.5:
-            # P1 = ganador real
-            p1, p2, y = w, l, 1
-
-            p1_age, p2_age = w_age, l_age
-            p1_height, p2_height = w_height, l_height
-            p1_lefty, p2_lefty = w_lefty, l_lefty
-
-            p1_elo, p2_elo = w_elo, l_elo
-            p1_selo, p2_selo = w_selo, l_selo
-
-            p1_rank, p2_rank = w_rank, l_rank
-            p1_rp, p2_rp = w_rp, l_rp
-
-            p1_rank_d4, p2_rank_d4 = w_rank_d4, l_rank_d4
-            p1_rp_d4, p2_rp_d4 = w_rp_d4, l_rp_d4
-            p1_rank_d8, p2_rank_d8 = w_rank_d8, l_rank_d8
-            p1_rp_d8, p2_rp_d8 = w_rp_d8, l_rp_d8
-
-            p1_wr10, p2_wr10 = w_wr10, l_wr10
-            p1_wr20, p2_wr20 = w_wr20, l_wr20
-            p1_st, p2_st = w_st, l_st
-
-            p1_rest, p2_rest = w_rest, l_rest
-            p1_m7, p2_m7 = w_m7, l_m7
-            p1_m14, p2_m14 = w_m14, l_m14
-            p1_m30, p2_m30 = w_m30, l_m30
-
-            p1_tms, p2_tms = w_tms, l_tms
-            p1_tmin, p2_tmin = w_tmin, l_tmin
-
-            p1_entry, p2_entry = w_entry, l_entry
-            p1_seed, p2_seed = w_seed, l_seed
-
-            h2h_diff = wl_h2h
-            h2h_surface_diff = wl_h2h_s
-
-            p1_ace, p2_ace = w_ace, l_ace
-            p1_df, p2_df = w_df, l_df
-            p1_1stin, p2_1stin = w_1stin, l_1stin
-            p1_1stwon, p2_1stwon = w_1stwon, l_1stwon
-            p1_2ndwon, p2_2ndwon = w_2ndwon, l_2ndwon
-            p1_bps, p2_bps = w_bps, l_bps
-        else:
-            # P1 = perdedor real
-            p1, p2, y = l, w, 0
-
-            p1_age, p2_age = l_age, w_age
-            p1_height, p2_height = l_height, w_height
-            p1_lefty, p2_lefty = l_lefty, w_lefty
-
-            p1_elo, p2_elo = l_elo, w_elo
-            p1_selo, p2_selo = l_selo, w_selo
-
-            p1_rank, p2_rank = l_rank, w_rank
-            p1_rp, p2_rp = l_rp, w_rp
-
-            p1_rank_d4, p2_rank_d4 = l_rank_d4, w_rank_d4
-            p1_rp_d4, p2_rp_d4 = l_rp_d4, w_rp_d4
-            p1_rank_d8, p2_rank_d8 = l_rank_d8, w_rank_d8
-            p1_rp_d8, p2_rp_d8 = l_rp_d8, w_rp_d8
-
-            p1_wr10, p2_wr10 = l_wr10, w_wr10
-            p1_wr20, p2_wr20 = l_wr20, w_wr20
-            p1_st, p2_st = l_st, w_st
-
-            p1_rest, p2_rest = l_rest, w_rest
-            p1_m7, p2_m7 = l_m7, w_m7
-            p1_m14, p2_m14 = l_m14, w_m14
-            p1_m30, p2_m30 = l_m30, w_m30
-
-            p1_tms, p2_tms = l_tms, w_tms
-            p1_tmin, p2_tmin = l_tmin, w_tmin
-
-            p1_entry, p2_entry = l_entry, w_entry
-            p1_seed, p2_seed = l_seed, w_seed
-
-            h2h_diff = -wl_h2h
-            h2h_surface_diff = -wl_h2h_s
-
-            p1_ace, p2_ace = l_ace, w_ace
-            p1_df, p2_df = l_df, w_df
-            p1_1stin, p2_1stin = l_1stin, w_1stin
-            p1_1stwon, p2_1stwon = l_1stwon, w_1stwon
-            p1_2ndwon, p2_2ndwon = l_2ndwon, w_2ndwon
-            p1_bps, p2_bps = l_bps, w_bps
-
-        rows.append(
-            {
-                "date": date,
-                "tourney_id": tid,
-                "tourney_level": level,
-                "surface": surface,
-                "round": round_,
-                "best_of": best_of,
-                "p1_id": int(p1),
-                "p2_id": int(p2),
-                "y_p1_win": int(y),
-                "age_diff": (p1_age - p2_age) if (not np.isnan(p1_age) and not np.isnan(p2_age)) else np.nan,
-                "height_diff": (p1_height - p2_height) if (
-                            not np.isnan(p1_height) and not np.isnan(p2_height)) else np.nan,
-                "lefty_diff": (p1_lefty - p2_lefty) if (not np.isnan(p1_lefty) and not np.isnan(p2_lefty)) else np.nan,
-                "p1_lefty": p1_lefty,
-                "p2_lefty": p2_lefty,
-
-                "elo_diff": p1_elo - p2_elo,
-                "surface_elo_diff": p1_selo - p2_selo,
-
-                "rank_diff": p1_rank - p2_rank,
-                "rank_points_diff": p1_rp - p2_rp,
-                "rank_d4_diff": p1_rank_d4 - p2_rank_d4,
-                "rank_points_d4_diff": p1_rp_d4 - p2_rp_d4,
-                "rank_d8_diff": p1_rank_d8 - p2_rank_d8,
-                "rank_points_d8_diff": p1_rp_d8 - p2_rp_d8,
-
-                "wr10_diff": p1_wr10 - p2_wr10,
-                "wr20_diff": p1_wr20 - p2_wr20,
-                "streak_diff": p1_st - p2_st,
-
-                "rest_diff": p1_rest - p2_rest,
-                "m7_diff": p1_m7 - p2_m7,
-                "m14_diff": p1_m14 - p2_m14,
-                "m30_diff": p1_m30 - p2_m30,
-
-                "tourney_matches_so_far_diff": p1_tms - p2_tms,
-                "tourney_minutes_so_far_diff": p1_tmin - p2_tmin,
-
-                "h2h_diff": h2h_diff,
-                "h2h_surface_diff": h2h_surface_diff,
-
-                "seed_diff": (p1_seed - p2_seed) if (not np.isnan(p1_seed) and not np.isnan(p2_seed)) else np.nan,
-                "entry_p1": str(p1_entry) if p1_entry is not None and not (isinstance(p1_entry, float) and np.isnan(p1_entry)) else "NONE",
-                "entry_p2": str(p2_entry) if p2_entry is not None and not (isinstance(p2_entry, float) and np.isnan(p2_entry)) else "NONE",
-
-                "ace_rate_diff": p1_ace - p2_ace,
-                "df_rate_diff": p1_df - p2_df,
-                "first_in_rate_diff": p1_1stin - p2_1stin,
-                "first_won_rate_diff": p1_1stwon - p2_1stwon,
-                "second_won_rate_diff": p1_2ndwon - p2_2ndwon,
-                "bp_saved_rate_diff": p1_bps - p2_bps,
-            }
-        )
+        # qualies diferidas hasta esta fecha
+        while next_qual is not None and next_qual[0] <= date:
+            q_date, q_tid, q_w, q_l, q_minutes = next_qual
+            if use_glicko:
+                glicko.advance(q_date)
+                glicko.add_match(q_w, q_l)
+            if use_tourney:
+                tourney_load.advance(q_date)
+                tourney_load.update_post_match(q_tid, q_date, q_w, q_l, q_minutes)
+            next_qual = next(deferred_quals, None)
+
+        if snapshots is not None:
+            snapshots.maybe_snapshot(date, _snapshot_state)
+
+        ctx_rows.append((date, tid, level, surface, round_, best_of))
+        ids.append((w, l))
+        seeds.append((_to_float(r.get("winner_seed")), _to_float(r.get("loser_seed"))))
+        entries.append((r.get("winner_entry"), r.get("loser_entry")))
+
+        if use_player:
+            w_rec["player"].append((_player_age(w, date), _player_height(w), _player_lefty(w)))
+            l_rec["player"].append((_player_age(l, date), _player_height(l), _player_lefty(l)))
+
+        if track_last_date:
+            w_rest = rest_days(last_date, w, date)
+            l_rest = rest_days(last_date, l, date)
+
+        if use_elo:
+            # Decay pre-match
+            elo.decay_if_needed(w, w_rest)
+            elo.decay_if_needed(l, l_rest)
+
+            # Elo pre-match
+            w_rec["elo"].append((elo.get(w), elo.get(w, std_surface)))
+            l_rec["elo"].append((elo.get(l), elo.get(l, std_surface)))
+
+        if use_glicko:
+            # Glicko-2: ratings congelados del último período cerrado
+            glicko.advance(date)
+            w_rec["glicko"].append((glicko.get(w), glicko.rd(w)))
+            l_rec["glicko"].append((glicko.get(l), glicko.rd(l)))
+
+        if use_form:
+            # Forma pre-match, global y por superficie / nivel (Unknown => sin historia de superficie)
+            for pid, rec in ((w, w_rec), (l, l_rec)):
+                rec["form"].append((
+                    winrate_last(win_hist, pid, 10),
+                    winrate_last(win_hist, pid, 20),
+                    get_streak(streak, pid),
+                    winrate_last(win_hist, surface_key(pid, std_surface), 20) if std_surface else 0.5,
+                    winrate_last(win_hist, level_key(pid, level), 20),
+                ))
+
+        if use_fatigue:
+            # Fatiga pre-match
+            for pid, rest, rec in ((w, w_rest, w_rec), (l, l_rest, l_rec)):
+                rec["fatigue"].append((
+                    rest,
+                    matches_last_days(match_dates, pid, date, 7),
+                    matches_last_days(match_dates, pid, date, 14),
+                    matches_last_days(match_dates, pid, date, 30),
+                ))
+
+        if use_tourney:
+            # Carga del torneo pre-match (solo torneos abiertos; el stream main es cronológico)
+            tourney_load.advance(date)
+            for pid, rec in ((w, w_rec), (l, l_rec)):
+                rec["tourney"].append((tourney_load.matches_so_far(tid, pid), tourney_load.minutes_so_far(tid, pid)))
+
+        if use_h2h:
+            # H2H pre-match (w vs l)
+            pair_rec["h2h"].append((
+                h2h_pre_match(h2h_global, w, l),
+                h2h_surface_pre_match(h2h_surface, surface, w, l),
+            ))
+
+        if use_rank:
+            # Rankings desde el match file (imputados) + deltas 4/8 semanas desde rank_hist
+            for pid, side, rec in ((w, "winner", w_rec), (l, "loser", l_rec)):
+                rank = _to_float(r.get(f"{side}_rank"))
+                rp = _to_float(r.get(f"{side}_rank_points"))
+                if np.isnan(rank):
+                    rank = float(default_rank_impute)
+                if np.isnan(rp):
+                    rp = float(default_rp_impute)
+
+                d = _rank_deltas_for_player(rank_hist, pid, date, weeks_list=(4, 8))
+                rec["rank"].append((rank, rp, d["rank_d4"], d["rp_d4"], d["rank_d8"], d["rp_d8"]))
+
+        if use_stats:
+            # Stats rolling pre-match (global y en la superficie del partido)
+            for pid, rec in ((w, w_rec), (l, l_rec)):
+                glob = tuple(stat_avgs(stats_hist, pid, n=roll_n).values())
+                if std_surface:
+                    surf = tuple(stat_avgs(stats_hist, surface_key(pid, std_surface), n=roll_n).values())
+                else:
+                    surf = no_surface_stats
+                rec["stats"].append(glob + surf)
 
         # Post-match updates (con el orden real winner/loser)
         post_match_update(r, date, w, l, level, surface, tid)
 
-    out = pd.DataFrame(rows)
-    out["surface"] = out["surface"].fillna("Unknown")
-    out["round"] = out["round"].fillna("UNK")
-    out["tourney_level"] = out["tourney_level"].fillna("UNK")
-    out["entry_p1"] = out["entry_p1"].fillna("NONE")
-    out["entry_p2"] = out["entry_p2"].fillna("NONE")
-    return out
+    if snapshots is not None and ctx_rows:
+        # último snapshot: estado después del último partido
+        snapshots.snapshot(ctx_rows[-1][0] + pd.Timedelta(days=1), _snapshot_state)
+
+    # 2) Columnas por lado
+    context = {c: _column(ctx_rows, j) for j, c in enumerate(CONTEXT_COLUMNS)}
+    context["date"] = pd.DatetimeIndex(context["date"]).to_numpy()
+    context["best_of"] = context["best_of"].astype(float)
+    winner = {"id": _column(ids, 0, np.int64), "seed": _column(seeds, 0, float), "entry": entry_strings(_column(entries, 0))}
+    loser = {"id": _column(ids, 1, np.int64), "seed": _column(seeds, 1, float), "entry": entry_strings(_column(entries, 1))}
+    pair: Dict[str, np.ndarray] = {}
+
+    # dtype inferido por columna: los contadores (racha, partidos, h2h) quedan enteros
+    for g, sides in SIDE_FEATURES.items():
+        if g not in use:
+            continue
+        for j, f in enumerate(sides):
+            winner[f] = np.array([t[j] for t in w_rec[g]])
+            loser[f] = np.array([t[j] for t in l_rec[g]])
+    for g, feats in PAIR_FEATURES.items():
+        if g not in use:
+            continue
+        for j, f in enumerate(feats):
+            pair[f] = np.array([t[j] for t in pair_rec[g]])
+
+    return context, winner, loser, pair
+
+
+def _column(rows: List[tuple], j: int, dtype=None) -> np.ndarray:
+    if dtype is not None:
+        return np.array([t[j] for t in rows], dtype=dtype)
+    col = np.empty(len(rows), dtype=object)
+    col[:] = [t[j] for t in rows]
+    return col
+
+
+@dataclass(frozen=True)
+class SourceFiles:
+    """Archivos de entrada de un circuito (también son la clave de las etapas cacheadas)."""
+    circuit: Circuit
+    raw_dir: Path
+    matches: List[Path]
+    players: List[Path]
+    rankings: List[Path]
+
+
+def _source_files(circuit: Circuit, raw_dir: Path, features, use_rankings: bool, year_from: int, year_to: int) -> SourceFiles:
+    matches = [raw_dir / circuit.matches_file(y) for y in range(year_from, year_to + 1)]
+    return SourceFiles(
+        circuit=circuit,
+        raw_dir=raw_dir,
+        matches=[p for p in matches if p.exists()],
+        players=[raw_dir / circuit.players_file] if "player" in features else [],
+        rankings=sorted(raw_dir.glob(f"{circuit.rankings_prefix}*.csv")) if use_rankings else [],
+    )
+
+
+def _load_shared_tables(cache: StageCache, src: SourceFiles, years):
+    """
+    Players, rank_hist y el reporte de validación de rankings del tour. La clave
+    depende solo de los archivos, así que los circuitos del mismo tour
+    (atp, atp_qual_chall, ...) comparten la entrada del cache.
+    """
+    year_from, year_to = years["year_from"], years["year_to"]
+    circuit, raw_dir = src.circuit, src.raw_dir
+
+    if src.players:
+        players_lookup = cache.get_or_compute(
+            "players", src.players, {}, lambda: load_players_lookup(raw_dir, circuit.players_file)
+        )
+    else:
+        players_lookup = {}
+
+    def load_rank_hist():
+        report = ValidationReport(keep_rows=True)
+        df = load_rankings(year_from, year_to, raw_dir=raw_dir, prefix=circuit.rankings_prefix, report=report)
+        return build_rank_hist(df), report
+
+    if src.rankings:
+        rank_hist, report = cache.get_or_compute("rank_hist", src.rankings, years, load_rank_hist)
+    else:
+        rank_hist, report = {}, ValidationReport()
+    return players_lookup, rank_hist, report
+
+
+def _load_match_tables(args, cache: StageCache, years, src: SourceFiles):
+    """(df_main, df_qual, reporte de validación de los partidos), vía cache de etapas."""
+    year_from, year_to = years["year_from"], years["year_to"]
+
+    def load_split():
+        # las violaciones son pocas: el reporte guarda las filas y viaja en el cache con los partidos
+        report = ValidationReport(keep_rows=True)
+        df_all = load_matches(year_from, year_to, raw_dir=src.raw_dir, pattern=src.circuit.matches_pattern, report=report)
+        # Qualies dentro del mismo archivo: rounds que empiezan con "Q"
+        is_qual = df_all["round"].astype(str).str.startswith("Q", na=False)
+        df_main = df_all[~is_qual].reset_index(drop=True)
+        df_qual = df_all[is_qual].reset_index(drop=True) if args.use_qual_for_elo else None
+        return df_main, df_qual, report
+
+    df_main, df_qual, report = cache.get_or_compute(
+        "matches", src.matches, {**years, "use_qual_for_elo": args.use_qual_for_elo}, load_split
+    )
+    return df_main, df_qual, report
+
+
+def _build_from_sources(args, cache: StageCache, features, years, src: SourceFiles):
+    """Carga (vía cache de etapas) y corre el replay online."""
+    df_main, df_qual, report = _load_match_tables(args, cache, years, src)
+    players_lookup, rank_hist, rank_report = _load_shared_tables(cache, src, years)
+    report.extend(rank_report)
+
+    recorder = SnapshotRecorder(args.snapshot_every) if args.snapshot_every else None
+
+    df_out = build_dataset(
+        df_main=df_main,
+        df_qual_for_updates=df_qual,
+        rank_hist=rank_hist,
+        players_lookup=players_lookup,
+        seed=args.seed,
+        elo_backend=args.elo_backend,
+        backend=args.backend,
+        mirror=args.mirror,
+        features=features,
+        snapshots=recorder,
+    )
+    return df_out, (recorder.to_index() if recorder is not None else None), report
+
+
+def build_circuit(args, src: SourceFiles, features, years, out_path: Path) -> str:
+    """
+    Corrida completa de un circuito (cache del dataset, replay, CSV de salida).
+    Todo el estado online vive acá adentro, así que puede correr en un proceso
+    aparte. Devuelve el resumen a imprimir.
+    """
+    cache = StageCache(max_mb=args.cache_max_mb, enabled=not args.no_cache)
+    snap_path = out_path.with_name(out_path.stem + "_snapshots.npz")
+    quarantine_path = out_path.with_name(out_path.stem + "_quarantine.csv")
+    log: List[str] = []
+
+    # Dataset final: si las entradas, el código y los parámetros no cambiaron, se copia del cache
+    # (backend no entra en la clave: python y jit producen el mismo CSV)
+    dataset_params = {
+        **years,
+        "seed": args.seed,
+        # el orden de --features no cambia la salida
+        "features": sorted(set(features)),
+        "mirror": args.mirror,
+        "snapshot_every": args.snapshot_every,
+        "elo_backend": args.elo_backend,
+        "use_qual_for_elo": args.use_qual_for_elo,
+    }
+    inputs = src.matches + src.players + src.rankings
+    dataset_key = cache.key("dataset", inputs, dataset_params) if cache.enabled else ""
+    hit = cache.lookup("dataset", dataset_key, ".csv")
+    snap_hit = cache.lookup("snapshots", dataset_key, ".npz") if args.snapshot_every else None
+
+    from_cache = False
+    if hit is not None and (snap_hit is not None or not args.snapshot_every):
+        try:
+            shutil.copyfile(hit, out_path)
+            if snap_hit is not None:
+                shutil.copyfile(snap_hit, snap_path)
+            from_cache = True
+        except FileNotFoundError:
+            pass  # evictada por otro proceso entre lookup y copia: se reconstruye
+
+    if from_cache:
+        if snap_hit is not None:
+            log.append(f"Snapshots: {snap_path}")
+        log.append("(dataset leído del cache)")
+        df_out = pd.read_csv(out_path, usecols=["y_p1_win"])
+        if args.quarantine:
+            _, _, report = _load_match_tables(args, cache, years, src)
+            report.extend(_load_shared_tables(cache, src, years)[2])
+            log.append(f"Cuarentena: {report.write_quarantine(quarantine_path)} filas en {quarantine_path}")
+    else:
+        df_out, snapshot_index, report = _build_from_sources(args, cache, features, years, src)
+        df_out.to_csv(out_path, index=False)
+        if report.violations:
+            log.append(report.summary())
+        if args.quarantine:
+            log.append(f"Cuarentena: {report.write_quarantine(quarantine_path)} filas en {quarantine_path}")
+        if snapshot_index is not None:
+            snapshot_index.save(snap_path)
+            log.append(f"Snapshots: {snap_path}")
+
+        if cache.enabled:
+            cache.store_file("dataset", dataset_key, ".csv", lambda tmp: shutil.copyfile(out_path, tmp))
+            if snapshot_index is not None:
+                cache.store_file("snapshots", dataset_key, ".npz", lambda tmp: shutil.copyfile(snap_path, tmp))
+
+    log.append(f"Dataset generado: {out_path}")
+    log.append("Balance y_p1_win:")
+    log.append(df_out["y_p1_win"].value_counts(normalize=True).round(4).to_string())
+    return "\n".join(log)
 
 
 def main() -> None:
@@ -422,12 +681,66 @@ def main() -> None:
     ap.add_argument("--year-to", type=int, default=None)
     ap.add_argument("--seed", type=int, default=7)
     ap.add_argument("--out", type=str, default="atp_match_prediction_full.csv")
+    ap.add_argument(
+        "--circuits",
+        type=str,
+        default=None,
+        help=(
+            f"Circuitos a construir, separados por coma ({','.join(CIRCUITS)}). "
+            "Cada uno se escribe en <out>_<circuito>.csv, en paralelo. Default: solo atp en <out>."
+        ),
+    )
+    ap.add_argument("--workers", type=int, default=None, help="Procesos para --circuits (default: cantidad de CPUs).")
     ap.add_argument("--no-rankings", action="store_true")
+    ap.add_argument(
+        "--raw-dir",
+        type=Path,
+        default=None,
+        help="Directorio local con CSVs en formato tennis_atp (ej. los de synthetic.py); no descarga nada.",
+    )
     ap.add_argument("--use-qual-for-elo", action="store_true", help="Usa qualies (round empieza con Q) SOLO para updates.")
+    ap.add_argument(
+        "--features",
+        type=str,
+        default=None,
+        help=(
+            f"Grupos a calcular, separados por coma, o 'all'. Default: {','.join(DEFAULT_FEATURES)}. "
+            f"Opcionales: {','.join(OPTIONAL_GROUPS)}."
+        ),
+    )
+    ap.add_argument("--mirror", action="store_true", help="Emite cada partido en ambas orientaciones (P1 = ganador y P1 = perdedor).")
+    ap.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=None,
+        help="Guarda snapshots del estado de jugadores cada N días, más el estado post-partido de cada partido, en <out>_snapshots.npz (ver snapshots.py).",
+    )
+    ap.add_argument("--elo-backend", choices=sorted(ELO_BACKENDS), default="fast")
+    ap.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="python",
+        help="Loop online: 'python' (referencia) o 'jit' (fast_loop.py, usa Numba si está instalado).",
+    )
+    ap.add_argument(
+        "--quarantine",
+        action="store_true",
+        help="Escribe las filas que violan reglas de validación en <out>_quarantine.csv (ver validation.py).",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Recalcula todas las etapas sin leer ni escribir data/cache.")
+    ap.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_MB)
     args = ap.parse_args()
 
-    random.seed(args.seed)
-    np.random.seed(args.seed)
+    try:
+        features = parse_features(args.features)
+        circuits = [get_circuit(c.strip()) for c in (args.circuits or "atp").split(",") if c.strip()]
+    except ValueError as e:
+        ap.error(str(e))
+    if not circuits:
+        ap.error("--circuits vacío")
+    if args.backend == "jit" and args.snapshot_every:
+        ap.error("--snapshot-every solo está soportado con --backend python")
+    use_rankings = "rank" in features and not args.no_rankings
 
     if args.year_from is None or args.year_to is None:
         # rango completo soportado por Jeff Sackmann
@@ -436,41 +749,46 @@ def main() -> None:
     else:
         year_from = args.year_from
         year_to = args.year_to
+    years = {"year_from": year_from, "year_to": year_to}
 
-    ensure_atp_data(year_from, year_to, download_rankings=not args.no_rankings)
-
-    df_all = load_matches(year_from, year_to)
-
-    players_lookup = load_players_lookup()
+    if args.raw_dir is None:
+        for circuit in circuits:
+            ensure_circuit_data(circuit, year_from, year_to, download_rankings=use_rankings)
 
-    # Qualies dentro del mismo archivo: rounds que empiezan con "Q"
-    is_qual = df_all["round"].astype(str).str.startswith("Q", na=False)
-    df_main = df_all[~is_qual].reset_index(drop=True)
-    df_qual = df_all[is_qual].reset_index(drop=True) if args.use_qual_for_elo else None
+    sources = [
+        _source_files(c, args.raw_dir or c.raw_dir, features, use_rankings, year_from, year_to)
+        for c in circuits
+    ]
 
-    if args.no_rankings:
-        rank_hist = {}
+    out = Path(args.out)
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    if args.circuits is None:
+        out_paths = [PROCESSED_DIR / out]
     else:
-        rankings = load_rankings(year_from, year_to)
-        rank_hist = build_rank_hist(rankings)
-
-
-
-    df_out = build_dataset(
-        df_main=df_main,
-        df_qual_for_updates=df_qual,
-        rank_hist=rank_hist,
-        players_lookup=players_lookup,
-        seed=args.seed,
-    )
-
-    out_path = PROCESSED_DIR / args.out
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df_out.to_csv(out_path, index=False)
-
-    print(f"Dataset generado: {out_path}")
-    print("Balance y_p1_win:")
-    print(df_out["y_p1_win"].value_counts(normalize=True).round(4))
+        out_paths = [PROCESSED_DIR / f"{out.stem}_{c.name}{out.suffix}" for c in circuits]
+
+    if len(sources) == 1:
+        print(build_circuit(args, sources[0], features, years, out_paths[0]))
+        return
+
+    # Players / rankings se cargan una vez por tour acá; los workers los leen del cache
+    cache = StageCache(max_mb=args.cache_max_mb, enabled=not args.no_cache)
+    if cache.enabled:
+        shared = {}
+        for src in sources:
+            shared.setdefault((tuple(src.players), tuple(src.rankings)), src)
+        for src in shared.values():
+            _load_shared_tables(cache, src, years)
+
+    workers = min(args.workers or os.cpu_count() or 1, len(sources))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(build_circuit, args, src, features, years, path): src.circuit.name
+            for src, path in zip(sources, out_paths)
+        }
+        for fut in as_completed(futures):
+            print(f"[{futures[fut]}]")
+            print(fut.result())
 
 
 if __name__ == "__main__":
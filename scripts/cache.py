@@ -0,0 +1,192 @@
+"""
+cache.py
+
+Cache de etapas del pipeline, direccionado por contenido.
+
+Cada etapa (partidos limpios, rank_hist, players, dataset final) se guarda en
+data/cache bajo una clave = hash(hash de los archivos de entrada, versión del
+código, parámetros). La versión del código es el hash de los scripts que el
+punto de entrada importa (build_dataset y sus módulos): editar evaluate.py o
+benchmark.py no invalida el cache del build. Si nada cambió, la etapa se lee del disco en vez de
+recalcularse. El directorio tiene un tope de tamaño con evicción LRU
+(por mtime, que se actualiza en cada hit).
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+from utils import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "cache"
+DEFAULT_MAX_MB = 2048
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+T = TypeVar("T")
+
+
+def file_digest(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def local_modules(root: str) -> List[Path]:
+    """Scripts de SCRIPTS_DIR que `root` importa, transitivamente (incluye imports dentro de funciones)."""
+    seen = set()
+    stack = [root]
+    while stack:
+        name = stack.pop()
+        path = SCRIPTS_DIR / f"{name}.py"
+        if name in seen or not path.exists():
+            continue
+        seen.add(name)
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Import):
+                stack += [a.name.split(".")[0] for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                stack.append(node.module.split(".")[0])
+    return sorted(SCRIPTS_DIR / f"{name}.py" for name in seen)
+
+
+def code_version(root: str = "build_dataset") -> str:
+    """Hash de los scripts que usa `root`: cualquier cambio en ese código invalida el cache."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in local_modules(root):
+        h.update(p.name.encode())
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+class StageCache:
+    def __init__(self, root: Path = CACHE_DIR, max_mb: int = DEFAULT_MAX_MB, enabled: bool = True, code_root: str = "build_dataset"):
+        self.root = Path(root)
+        self.code_root = code_root
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self.enabled = enabled
+        self._digests: Dict[Path, str] = {}
+        self._code: Optional[str] = None
+
+    def _digest(self, path: Path) -> str:
+        path = Path(path)
+        if path not in self._digests:
+            self._digests[path] = file_digest(path)
+        return self._digests[path]
+
+    def key(self, stage: str, inputs: Iterable[Path], params: dict) -> str:
+        if self._code is None:
+            self._code = code_version(self.code_root)
+        payload = {
+            "stage": stage,
+            "code": self._code,
+            "inputs": sorted((Path(p).name, self._digest(p)) for p in inputs),
+            "params": params,
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    def path(self, stage: str, key: str, suffix: str) -> Path:
+        return self.root / f"{stage}-{key}{suffix}"
+
+    def lookup(self, stage: str, key: str, suffix: str) -> Optional[Path]:
+        """Path de la entrada si existe (y la marca como usada para el LRU)."""
+        if not self.enabled:
+            return None
+        p = self.path(stage, key, suffix)
+        try:
+            os.utime(p)
+        except FileNotFoundError:  # no existe, o la evictó otro proceso
+            return None
+        return p
+
+    def store_file(self, stage: str, key: str, suffix: str, write: Callable[[Path], None]) -> Path:
+        """Escribe la entrada con `write(tmp_path)` y la publica atómicamente."""
+        p = self.path(stage, key, suffix)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".tmp{os.getpid()}")
+        try:
+            write(tmp)
+            os.replace(tmp, p)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.evict(keep=p)
+        return p
+
+    def store_dir(self, stage: str, key: str, write: Callable[[Path], None]) -> Path:
+        """Como store_file, para entradas que son un directorio (ej. columnas .npy memory-mapped)."""
+        p = self.path(stage, key, "")
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".tmp{os.getpid()}")
+        try:
+            tmp.mkdir()
+            write(tmp)
+            try:
+                os.replace(tmp, p)
+            except OSError:
+                if not p.exists():  # otro proceso ya publicó la misma entrada
+                    raise
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp)
+        self.evict(keep=p)
+        return p
+
+    def get_or_compute(self, stage: str, inputs: Iterable[Path], params: dict, compute: Callable[[], T]) -> T:
+        if not self.enabled:
+            return compute()
+
+        key = self.key(stage, inputs, params)
+        hit = self.lookup(stage, key, ".pkl")
+        if hit is not None:
+            try:
+                with open(hit, "rb") as f:
+                    return pickle.load(f)
+            except FileNotFoundError:
+                pass  # evictada por otro proceso entre lookup y open: se recalcula
+
+        value = compute()
+
+        def write(tmp: Path) -> None:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.store_file(stage, key, ".pkl", write)
+        return value
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Borra las entradas menos usadas hasta quedar bajo max_bytes."""
+        if not self.root.exists():
+            return
+        entries = []
+        for p in self.root.iterdir():
+            if ".tmp" in p.name:
+                continue
+            try:
+                st = p.stat()
+                size = sum(f.stat().st_size for f in p.iterdir()) if p.is_dir() else st.st_size
+            except FileNotFoundError:
+                continue  # otro proceso la está borrando
+            entries.append((st.st_mtime, size, p))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            if p.is_dir():
+                shutil.rmtree(p, ignore_errors=True)
+            else:
+                p.unlink(missing_ok=True)
+            total -= size
@@ -1,11 +1,62 @@
 import urllib.request
 import urllib.error
 import pandas as pd
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-from utils import RAW_ATP_DIR, parse_yyyymmdd
+from utils import RAW_DIR, RAW_ATP_DIR, parse_yyyymmdd
+from validation import ValidationReport, validate_matches
 
 ATP_BASE = "https://raw.githubusercontent.com/JeffSackmann/tennis_atp/master/"
+WTA_BASE = "https://raw.githubusercontent.com/JeffSackmann/tennis_wta/master/"
+
+
+@dataclass(frozen=True)
+class Circuit:
+    """
+    Una fuente de partidos con el layout de Sackmann: archivos de partidos por
+    año más las tablas de rankings y jugadores del tour (compartidas entre los
+    circuitos del mismo repo, ej. atp y atp_qual_chall).
+    """
+    name: str
+    base_url: str
+    raw_dir: Path
+    matches_pattern: str
+    rankings_prefix: str
+    rankings_files: Tuple[str, ...]
+    players_file: str
+
+    def matches_file(self, year: int) -> str:
+        return self.matches_pattern.format(year=year)
+
+
+_ATP_RANKINGS = ("atp_rankings_00s.csv", "atp_rankings_10s.csv", "atp_rankings_20s.csv", "atp_rankings_current.csv")
+_WTA_RANKINGS = ("wta_rankings_00s.csv", "wta_rankings_10s.csv", "wta_rankings_20s.csv", "wta_rankings_current.csv")
+
+
+def _atp(name: str, pattern: str) -> Circuit:
+    return Circuit(name, ATP_BASE, RAW_ATP_DIR, pattern, "atp_rankings_", _ATP_RANKINGS, "atp_players.csv")
+
+
+def _wta(name: str, pattern: str) -> Circuit:
+    return Circuit(name, WTA_BASE, RAW_DIR / "wta", pattern, "wta_rankings_", _WTA_RANKINGS, "wta_players.csv")
+
+
+CIRCUITS: Dict[str, Circuit] = {
+    "atp": _atp("atp", "atp_matches_{year}.csv"),
+    "atp_qual_chall": _atp("atp_qual_chall", "atp_matches_qual_chall_{year}.csv"),
+    "atp_futures": _atp("atp_futures", "atp_matches_futures_{year}.csv"),
+    "wta": _wta("wta", "wta_matches_{year}.csv"),
+    "wta_qual_itf": _wta("wta_qual_itf", "wta_matches_qual_itf_{year}.csv"),
+}
+
+
+def get_circuit(name: str) -> Circuit:
+    try:
+        return CIRCUITS[name]
+    except KeyError:
+        raise ValueError(f"Circuito desconocido: {name!r} (opciones: {sorted(CIRCUITS)})") from None
 
 
 def download(url: str, out: Path) -> bool:
@@ -23,40 +74,49 @@ def download(url: str, out: Path) -> bool:
         return False
 
 
-def ensure_atp_data(year_from: int, year_to: int, download_rankings: bool = True) -> None:
+def ensure_circuit_data(circuit: Circuit, year_from: int, year_to: int, download_rankings: bool = True) -> None:
     """
-    Download all required ATP datasets from Jeff Sackmann repository.
+    Download all required datasets of a circuit from Jeff Sackmann repositories.
     """
-    RAW_ATP_DIR.mkdir(parents=True, exist_ok=True)
+    circuit.raw_dir.mkdir(parents=True, exist_ok=True)
 
     for y in range(year_from, year_to + 1):
-        download(
-            ATP_BASE + f"atp_matches_{y}.csv",
-            RAW_ATP_DIR / f"atp_matches_{y}.csv",
-        )
+        name = circuit.matches_file(y)
+        download(circuit.base_url + name, circuit.raw_dir / name)
 
     if download_rankings:
-        for rf in [
-            "atp_rankings_00s.csv",
-            "atp_rankings_10s.csv",
-            "atp_rankings_20s.csv",
-            "atp_rankings_current.csv",
-        ]:
-            download(ATP_BASE + rf, RAW_ATP_DIR / rf)
+        for rf in circuit.rankings_files:
+            download(circuit.base_url + rf, circuit.raw_dir / rf)
 
-    download(ATP_BASE + "atp_players.csv", RAW_ATP_DIR / "atp_players.csv")
+    download(circuit.base_url + circuit.players_file, circuit.raw_dir / circuit.players_file)
 
 
-def load_matches(year_from: int, year_to: int) -> pd.DataFrame:
+def ensure_atp_data(year_from: int, year_to: int, download_rankings: bool = True) -> None:
     """
-    Load ATP matches and return them ordered chronologically.
+    Download all required ATP datasets from Jeff Sackmann repository.
+    """
+    ensure_circuit_data(CIRCUITS["atp"], year_from, year_to, download_rankings=download_rankings)
+
+
+def load_matches(
+    year_from: int,
+    year_to: int,
+    raw_dir: Path = RAW_ATP_DIR,
+    pattern: str = "atp_matches_{year}.csv",
+    report: Optional[ValidationReport] = None,
+) -> pd.DataFrame:
+    """
+    Load ATP matches, validated (see validation.py), and return them ordered chronologically.
     """
     parts = []
     for y in range(year_from, year_to + 1):
-        p = RAW_ATP_DIR / f"atp_matches_{y}.csv"
+        p = raw_dir / pattern.format(year=y)
         if p.exists():
             parts.append(pd.read_csv(p, low_memory=False))
 
+    if not parts:
+        raise FileNotFoundError(f"No hay archivos {pattern.format(year='YYYY')} en {raw_dir} para {year_from}-{year_to}")
+
     df = pd.concat(parts, ignore_index=True)
     df["tourney_date"] = df["tourney_date"].apply(parse_yyyymmdd)
 
@@ -64,16 +124,18 @@ def load_matches(year_from: int, year_to: int) -> pd.DataFrame:
     df["winner_id"] = df["winner_id"].astype(int)
     df["loser_id"] = df["loser_id"].astype(int)
 
+    df = validate_matches(df, report)
+
     return df.sort_values(
         ["tourney_date", "tourney_id", "match_num"],
         kind="mergesort"
     ).reset_index(drop=True)
 
-def load_players_lookup() -> dict:
+def load_players_lookup(raw_dir: Path = RAW_ATP_DIR) -> dict:
     """
     Load atp_players.csv and return dict: pid -> {"dob": Timestamp, "height": float, "hand": str}
     """
-    p = RAW_ATP_DIR / "atp_players.csv"
+    p = raw_dir / "atp_players.csv"
     if not p.exists():
         raise FileNotFoundError(f"No existe {p}. Corré ensure_atp_data primero.")
 
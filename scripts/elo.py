@@ -1,6 +1,6 @@
 import numpy as np
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 ELO_BASE = 1500.0
 SURFACES = {"Hard", "Clay", "Grass", "Carpet"}
@@ -23,6 +23,25 @@ LEVEL_MULT = {
 DECAY_START_DAYS = 180
 HALF_LIFE_DAYS = 180
 
+# Tablas precomputadas (FastEloState). rest_days viene acotado por
+# features_fatigue.rest_days (cap = 730), matches_played es un contador entero.
+DECAY_TABLE_DAYS = 365 * 2
+K_TABLE_MATCHES = 4096
+
+DECAY_TABLE = [0.5 ** (d / HALF_LIFE_DAYS) for d in range(DECAY_TABLE_DAYS + 1)]
+K_TABLE = [K_MIN + (K_MAX - K_MIN) * np.exp(-m / K_EXP_SCALE) for m in range(K_TABLE_MATCHES)]
+
+
+def win_prob_array(ra, rb) -> np.ndarray:
+    """
+    Versión vectorizada de EloState.win_prob para arrays de ratings.
+    np.power puede diferir en el último ulp de `10 ** x` escalar, así que
+    el loop online sigue usando la versión escalar.
+    """
+    ra = np.asarray(ra, dtype=float)
+    rb = np.asarray(rb, dtype=float)
+    return 1.0 / (1.0 + np.power(10.0, (rb - ra) / 400))
+
 
 @dataclass
 class EloState:
@@ -81,3 +100,108 @@ class EloState:
 
         self.matches_played[winner] = self.matches_played.get(winner, 0) + 1
         self.matches_played[loser] = self.matches_played.get(loser, 0) + 1
+
+
+class FastEloState(EloState):
+    """
+    Mismo EloState, con K y decay leídos de tablas precomputadas en vez de
+    recalcular exp/pow en cada partido. Resultados numéricos idénticos.
+    """
+
+    def k_experience(self, pid: int) -> float:
+        m = self.matches_played.get(pid, 0)
+        if m < K_TABLE_MATCHES:
+            return K_TABLE[m]
+        return super().k_experience(pid)
+
+    def decay_if_needed(self, pid: int, rest_days: int) -> None:
+        if rest_days < DECAY_START_DAYS:
+            return
+        if not (isinstance(rest_days, int) and rest_days <= DECAY_TABLE_DAYS):
+            return super().decay_if_needed(pid, rest_days)
+
+        f = DECAY_TABLE[rest_days]
+        self.elo_global[pid] = ELO_BASE + (self.elo_global.get(pid, ELO_BASE) - ELO_BASE) * f
+        for s in SURFACES:
+            table = self.elo_surface[s]
+            table[pid] = ELO_BASE + (table.get(pid, ELO_BASE) - ELO_BASE) * f
+
+
+class LazyEloState(FastEloState):
+    """
+    Decay aplicado al leer en vez de escribirse en todas las superficies.
+
+    Cada rating se guarda como (rating, epoch), donde epoch es cuántos decays
+    del jugador ya estaban aplicados al escribirlo. decay_if_needed solo agrega
+    el factor al log del jugador; get aplica en orden los factores pendientes,
+    con la misma aritmética que el decay eager, así que los valores son idénticos.
+    Solo existen entradas para pares (jugador, superficie) realmente jugados.
+    """
+    elo_global: Dict[int, Tuple[float, int]]
+    elo_surface: Dict[str, Dict[int, Tuple[float, int]]]
+    decay_log: Dict[int, List[float]]
+
+    def __init__(self):
+        super().__init__()
+        self.decay_log = {}
+
+    def _read(self, table: Dict[int, Tuple[float, int]], pid: int) -> float:
+        entry = table.get(pid)
+        if entry is None:
+            # ELO_BASE es punto fijo del decay
+            return ELO_BASE
+
+        rating, epoch = entry
+        for f in self.decay_log.get(pid, ())[epoch:]:
+            rating = ELO_BASE + (rating - ELO_BASE) * f
+        return rating
+
+    def _write(self, table: Dict[int, Tuple[float, int]], pid: int, rating: float) -> None:
+        table[pid] = (rating, len(self.decay_log.get(pid, ())))
+
+    def get(self, pid: int, surface: Optional[str] = None) -> float:
+        if surface in SURFACES:
+            return self._read(self.elo_surface[surface], pid)
+        return self._read(self.elo_global, pid)
+
+    def decay_if_needed(self, pid: int, rest_days: int) -> None:
+        if rest_days < DECAY_START_DAYS:
+            return
+        if isinstance(rest_days, int) and rest_days <= DECAY_TABLE_DAYS:
+            f = DECAY_TABLE[rest_days]
+        else:
+            f = 0.5 ** (rest_days / HALF_LIFE_DAYS)
+        self.decay_log.setdefault(pid, []).append(f)
+
+    def update(self, winner: int, loser: int, level: str, surface: Optional[str]) -> None:
+        k = self.k_experience(winner)
+        k *= LEVEL_MULT.get(level, 1.0)
+
+        ra, rb = self.get(winner), self.get(loser)
+        pa = self.win_prob(ra, rb)
+
+        self._write(self.elo_global, winner, ra + k * (1 - pa))
+        self._write(self.elo_global, loser, rb - k * (1 - pa))
+
+        if surface in SURFACES:
+            rsa, rsb = self.get(winner, surface), self.get(loser, surface)
+            psa = self.win_prob(rsa, rsb)
+            self._write(self.elo_surface[surface], winner, rsa + k * (1 - psa))
+            self._write(self.elo_surface[surface], loser, rsb - k * (1 - psa))
+
+        self.matches_played[winner] = self.matches_played.get(winner, 0) + 1
+        self.matches_played[loser] = self.matches_played.get(loser, 0) + 1
+
+
+ELO_BACKENDS = {
+    "reference": EloState,
+    "fast": FastEloState,
+    "lazy": LazyEloState,
+}
+
+
+def make_elo_state(backend: str = "fast") -> EloState:
+    try:
+        return ELO_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"Elo backend desconocido: {backend!r} (opciones: {sorted(ELO_BACKENDS)})") from None
@@ -0,0 +1,282 @@
+"""
+evaluate.py
+
+Evaluación walk-forward de baselines sobre el dataset generado por build_dataset.
+
+- El CSV se convierte una vez a columnas .npy (en data/cache, clave = hash del
+  CSV + versión del código de evaluate) y se lee memory-mapped: cada worker
+  abre solo las columnas que usa.
+- Para cada temporada de test se entrena con todas las temporadas anteriores
+  (ventana expansiva) y se predice la temporada completa.
+- Baselines, todos vectorizados en NumPy:
+    elo     probabilidad Elo a partir de elo_diff (sin entrenamiento)
+    rank    logística 1-D sobre la diferencia de ranking en escala log
+    logreg  logística (Newton, L2) sobre todas las columnas *_diff estandarizadas
+- Las temporadas se evalúan en paralelo; el reporte tiene log-loss, accuracy y
+  Brier por temporada y superficie. En accuracy, p > 0.5 predice que gana P1 y
+  p == 0.5 (ej. Elo sin historia) cuenta como medio acierto.
+
+Uso:
+    python evaluate.py                                   # data/processed/atp_match_prediction_full.csv
+    python evaluate.py ../data/processed/x.csv --seasons 2015-2024 --models elo,logreg --out eval.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_DIR, DEFAULT_MAX_MB, StageCache
+from elo import win_prob_array
+from utils import PROCESSED_DIR
+
+MODELS = ("elo", "rank", "logreg")
+DEFAULT_CSV = PROCESSED_DIR / "atp_match_prediction_full.csv"
+
+EPS = 1e-15
+
+
+# ---- columnas memory-mapped ----
+
+def _write_columns(csv_path: Path, out_dir: Path) -> None:
+    df = pd.read_csv(csv_path, low_memory=False)
+    for c in df.columns:
+        v = df[c]
+        if c == "date":
+            arr = pd.to_datetime(v).to_numpy().astype("datetime64[D]")
+        elif pd.api.types.is_numeric_dtype(v):
+            arr = v.to_numpy(dtype=float)
+        else:
+            # unicode de ancho fijo: a diferencia de object, se puede mapear
+            arr = np.asarray(v.fillna("").astype(str).tolist(), dtype="U")
+        np.save(out_dir / f"{c}.npy", arr)
+
+
+def column_store(csv_path: Path, cache: Optional[StageCache] = None) -> Path:
+    """Directorio con una columna .npy por columna del CSV (se crea la primera vez)."""
+    cache = cache or StageCache(CACHE_DIR, DEFAULT_MAX_MB, code_root="evaluate")
+    # CSV + código: si cambia la extracción de columnas no se reusan .npy viejos
+    key = cache.key("columns", [csv_path], {})
+    hit = cache.lookup("columns", key, "")
+    if hit is not None:
+        return hit
+    return cache.store_dir("columns", key, lambda tmp: _write_columns(csv_path, tmp))
+
+
+def open_columns(store: Path, names: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    files = sorted(store.glob("*.npy"))
+    wanted = None if names is None else set(names)
+    return {f.stem: np.load(f, mmap_mode="r") for f in files if wanted is None or f.stem in wanted}
+
+
+def diff_columns(store: Path) -> List[str]:
+    return sorted(f.stem for f in store.glob("*_diff.npy"))
+
+
+# ---- modelos ----
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def fit_logreg(X: np.ndarray, y: np.ndarray, l2: float = 1.0, max_iter: int = 50, tol: float = 1e-8) -> np.ndarray:
+    """Logística con intercepto por Newton-Raphson; L2 sobre los coeficientes (no el intercepto)."""
+    n, k = X.shape
+    Xb = np.column_stack([np.ones(n), X])
+    reg = np.full(k + 1, float(l2))
+    reg[0] = 0.0
+    w = np.zeros(k + 1)
+    for _ in range(max_iter):
+        p = _sigmoid(Xb @ w)
+        grad = Xb.T @ (p - y) + reg * w
+        hess = (Xb * (p * (1.0 - p))[:, None]).T @ Xb + np.diag(reg)
+        step = np.linalg.solve(hess, grad)
+        w -= step
+        if np.max(np.abs(step)) < tol:
+            break
+    return w
+
+
+def predict_logreg(w: np.ndarray, X: np.ndarray) -> np.ndarray:
+    return _sigmoid(w[0] + X @ w[1:])
+
+
+def _standardize(train: np.ndarray, test: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """z-score con media / desvío del train; los NaN quedan en 0 (= la media)."""
+    with warnings.catch_warnings():
+        # columnas sin ningún valor en el train (ej. stats en años sin datos): quedan en 0
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mu = np.nanmean(train, axis=0)
+        sd = np.nanstd(train, axis=0)
+    mu = np.where(np.isnan(mu), 0.0, mu)
+    sd = np.where(np.isnan(sd) | (sd == 0), 1.0, sd)
+    return np.nan_to_num((train - mu) / sd), np.nan_to_num((test - mu) / sd)
+
+
+def _log_rank(rank_diff: np.ndarray) -> np.ndarray:
+    # rank más bajo = mejor: P1 favorito => rank_diff < 0 => feature > 0
+    return np.nan_to_num(-np.sign(rank_diff) * np.log1p(np.abs(rank_diff)))[:, None]
+
+
+# ---- walk-forward ----
+
+def _seasons(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    return cols["date"].astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def evaluate_season(store: Path, season: int, models: Sequence[str], train_from: int, l2: float) -> dict:
+    """Entrena con [train_from, season) y predice season. Devuelve y, surface y p por modelo."""
+    features = diff_columns(store)
+    cols = open_columns(store, ["date", "surface", "y_p1_win"] + features)
+    year = _seasons(cols)
+    train = (year >= train_from) & (year < season)
+    test = year == season
+
+    y = np.asarray(cols["y_p1_win"], dtype=float)
+    out = {"season": season, "n_train": int(train.sum()), "y": y[test], "surface": np.asarray(cols["surface"][test]), "p": {}}
+    if not test.any():
+        return out
+
+    if "elo" in models and "elo_diff" in cols:
+        d = np.asarray(cols["elo_diff"][test], dtype=float)
+        out["p"]["elo"] = np.where(np.isnan(d), 0.5, win_prob_array(d, 0.0))
+
+    if not train.any():
+        return out
+
+    if "rank" in models and "rank_diff" in cols:
+        r = np.asarray(cols["rank_diff"], dtype=float)
+        w = fit_logreg(_log_rank(r[train]), y[train], l2=l2)
+        out["p"]["rank"] = predict_logreg(w, _log_rank(r[test]))
+
+    if "logreg" in models and features:
+        X = np.column_stack([np.asarray(cols[c], dtype=float) for c in features])
+        X_train, X_test = _standardize(X[train], X[test])
+        w = fit_logreg(X_train, y[train], l2=l2)
+        out["p"]["logreg"] = predict_logreg(w, X_test)
+
+    return out
+
+
+def metrics(y: np.ndarray, p: np.ndarray) -> dict:
+    """log-loss (p recortada a [EPS, 1 - EPS]), accuracy con empates p == 0.5 como medio acierto, Brier."""
+    pc = np.clip(p, EPS, 1 - EPS)
+    correct = np.where(p == 0.5, 0.5, ((p > 0.5) == (y == 1)).astype(float))
+    return {
+        "n": int(len(y)),
+        "log_loss": float(-np.mean(y * np.log(pc) + (1 - y) * np.log(1 - pc))),
+        "accuracy": float(np.mean(correct)),
+        "brier": float(np.mean((p - y) ** 2)),
+    }
+
+
+def report(results: List[dict]) -> pd.DataFrame:
+    """Métricas por (modelo, temporada, superficie), con surface="All" por temporada y season="All" en total."""
+    rows = []
+    by_model: Dict[str, List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+    for res in sorted(results, key=lambda r: r["season"]):
+        for model, p in res["p"].items():
+            y, surf = res["y"], res["surface"]
+            by_model.setdefault(model, []).append((y, p, surf))
+            rows.append({"model": model, "season": str(res["season"]), "surface": "All", **metrics(y, p)})
+            for s in np.unique(surf):
+                m = surf == s
+                rows.append({"model": model, "season": str(res["season"]), "surface": s, **metrics(y[m], p[m])})
+
+    for model, parts in by_model.items():
+        y = np.concatenate([t[0] for t in parts])
+        p = np.concatenate([t[1] for t in parts])
+        surf = np.concatenate([t[2] for t in parts])
+        rows.append({"model": model, "season": "All", "surface": "All", **metrics(y, p)})
+        for s in np.unique(surf):
+            m = surf == s
+            rows.append({"model": model, "season": "All", "surface": s, **metrics(y[m], p[m])})
+
+    return pd.DataFrame(rows, columns=["model", "season", "surface", "n", "log_loss", "accuracy", "brier"])
+
+
+def run(
+    csv_path: Path,
+    seasons: Optional[Sequence[int]] = None,
+    models: Sequence[str] = MODELS,
+    train_from: Optional[int] = None,
+    min_train_seasons: int = 3,
+    l2: float = 1.0,
+    workers: Optional[int] = None,
+    cache: Optional[StageCache] = None,
+) -> pd.DataFrame:
+    store = column_store(csv_path, cache)
+    years = _seasons(open_columns(store, ["date"]))
+    first, last = int(years.min()), int(years.max())
+    train_from = first if train_from is None else train_from
+    if seasons is None:
+        seasons = range(train_from + min_train_seasons, last + 1)
+    seasons = [s for s in seasons if first <= s <= last]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(seasons), 1))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_season, store, s, tuple(models), train_from, l2) for s in seasons]
+        results = [f.result() for f in futures]
+    return report(results)
+
+
+def _parse_seasons(spec: Optional[str]) -> Optional[List[int]]:
+    if not spec:
+        return None
+    out: List[int] = []
+    for part in spec.split(","):
+        a, _, b = part.partition("-")
+        out += list(range(int(a), int(b or a) + 1))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Evaluación walk-forward de baselines sobre el dataset procesado.")
+    ap.add_argument("csv", type=Path, nargs="?", default=DEFAULT_CSV)
+    ap.add_argument("--seasons", type=str, default=None, help="Temporadas de test, ej. 2015-2024 o 2019,2021.")
+    ap.add_argument("--models", type=str, default=",".join(MODELS))
+    ap.add_argument("--train-from", type=int, default=None, help="Primera temporada usada para entrenar.")
+    ap.add_argument("--min-train-seasons", type=int, default=3)
+    ap.add_argument("--l2", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--by-surface", action="store_true", help="Imprime también el detalle por superficie.")
+    ap.add_argument("--out", type=Path, default=None, help="CSV con el reporte completo.")
+    args = ap.parse_args()
+
+    models = [m for m in args.models.split(",") if m]
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        ap.error(f"Modelos desconocidos: {sorted(unknown)} (opciones: {', '.join(MODELS)})")
+
+    rep = run(
+        args.csv,
+        seasons=_parse_seasons(args.seasons),
+        models=models,
+        train_from=args.train_from,
+        min_train_seasons=args.min_train_seasons,
+        l2=args.l2,
+        workers=args.workers,
+    )
+
+    pd.set_option("display.width", 200)
+    fmt = {"log_loss": "{:.4f}".format, "accuracy": "{:.4f}".format, "brier": "{:.4f}".format}
+    per_season = rep[rep["surface"] == "All"]
+    print(per_season.to_string(index=False, formatters=fmt))
+    if args.by_surface:
+        print()
+        print(rep[rep["surface"] != "All"].to_string(index=False, formatters=fmt))
+
+    if args.out is not None:
+        rep.to_csv(args.out, index=False)
+        print(f"Reporte: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
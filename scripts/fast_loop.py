@@ -0,0 +1,611 @@
+"""
+fast_loop.py
+
+Backend acelerado del replay online (build_dataset --backend jit).
+
+Los partidos (qualies para updates + main draw) se codifican a arrays enteros
+(jugadores, superficies, niveles, pares H2H, (torneo, jugador)) y el loop
+cronológico completo -- Elo con decay, forma, fatiga, H2H, stats rolling y
+carga del torneo -- corre en una sola función compilada con Numba si está
+instalado; si no, la misma función corre como Python puro.
+Player, rankings y Glicko se calculan fuera del loop.
+
+El resultado tiene que ser idéntico al de build_dataset.replay_online:
+`python fast_loop.py --year-from ... --year-to ...` corre ambos y compara
+columna por columna; `check_synthetic_parity` (tests/test_fast_loop.py) hace
+lo mismo sobre datos sintéticos, compilado y en Python puro.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from elo import DECAY_START_DAYS, DECAY_TABLE, ELO_BASE, K_EXP_SCALE, K_MAX, K_MIN, K_TABLE, LEVEL_MULT, SURFACES
+from features_form import FORM_WINDOW
+from features_stats import STAT_METRICS
+from glicko import Glicko2State
+from rankings import build_rank_index, rank_delta_weeks_array
+from symmetry import entry_strings
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:  # numba es opcional
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+# Columnas por lado que produce el kernel, en orden
+KERNEL_COLUMNS = (
+    "elo", "surface_elo",
+    "wr10", "wr20", "streak", "wr20_surface", "wr20_level",
+    "rest", "m7", "m14", "m30",
+    "tourney_matches_so_far", "tourney_minutes_so_far",
+) + STAT_METRICS + tuple(f"{m}_surface" for m in STAT_METRICS)
+
+# contadores: se devuelven como int64, igual que en el replay de referencia
+INT_COLUMNS = {"streak", "rest", "m7", "m14", "m30", "tourney_matches_so_far", "tourney_minutes_so_far"}
+
+ELO_SURFACES = tuple(sorted(SURFACES))
+REST_CAP = 365 * 2
+NO_DATE = np.iinfo(np.int64).min
+
+
+@njit(cache=True)
+def _rest(last, p, d):
+    prev = last[p]
+    if prev == NO_DATE:
+        return REST_CAP
+    r = d - prev
+    if r < 0:
+        r = 0
+    return min(r, REST_CAP)
+
+
+@njit(cache=True)
+def _decay(elo_g, elo_s, p, rest, decay_table):
+    if rest < DECAY_START_DAYS:
+        return
+    f = decay_table[rest]
+    elo_g[p] = ELO_BASE + (elo_g[p] - ELO_BASE) * f
+    for s in range(elo_s.shape[1]):
+        elo_s[p, s] = ELO_BASE + (elo_s[p, s] - ELO_BASE) * f
+
+
+@njit(cache=True)
+def _ring_mean(buf, cnt, key, n, default):
+    """Media de los últimos n valores válidos (mismo orden de suma que RollingWindowStore.mean)."""
+    c = cnt[key]
+    w = buf.shape[1]
+    m = min(n, c, w)
+    tot = 0.0
+    k = 0
+    for t in range(c - m, c):
+        v = buf[key, t % w]
+        if not math.isnan(v):
+            tot += v
+            k += 1
+    return tot / k if k > 0 else default
+
+
+@njit(cache=True)
+def _ring_mean_metric(buf, cnt, key, j, n, default):
+    c = cnt[key]
+    w = buf.shape[1]
+    m = min(n, c, w)
+    tot = 0.0
+    k = 0
+    for t in range(c - m, c):
+        v = buf[key, t % w, j]
+        if not math.isnan(v):
+            tot += v
+            k += 1
+    return tot / k if k > 0 else default
+
+
+@njit(cache=True)
+def _count_segment(hist, lo, hi, d, days):
+    # segmento ordenado por fecha: se recorre desde el final y se corta al salir de la ventana
+    c = 0
+    j = hi - 1
+    while j >= lo:
+        dd = d - hist[j]
+        if dd > days:
+            break
+        if dd >= 0:
+            c += 1
+        j -= 1
+    return c
+
+
+@njit(cache=True)
+def _matches_last_days(hist, start, fill, qual_count, p, d, days):
+    # historia del jugador = [qualies (ordenadas)] + [main (ordenado)]
+    lo = start[p]
+    q = min(fill[p], qual_count[p])
+    c = _count_segment(hist, lo, lo + q, d, days)
+    if fill[p] > qual_count[p]:
+        c += _count_segment(hist, lo + qual_count[p], lo + fill[p], d, days)
+    return c
+
+
+@njit(cache=True)
+def _online_loop(
+    day, wi, li, n_qual, esurf, lvl_w, lvl_l, mult, pair, pair_sign, spair, tkey_w, tkey_l, minutes,
+    w_rates, l_rates, n_players, n_level_keys, n_pairs, n_spairs, n_tkeys, hist_start, qual_count,
+    k_table, decay_table, roll_n, out_w, out_l, out_pair,
+):
+    n = day.shape[0]
+    n_stats = w_rates.shape[1]
+    n_surf = 4
+
+    elo_g = np.full(n_players, ELO_BASE)
+    elo_s = np.full((n_players, n_surf), ELO_BASE)
+    played = np.zeros(n_players, dtype=np.int64)
+
+    last = np.full(n_players, NO_DATE, dtype=np.int64)
+    hist = np.empty(hist_start[n_players], dtype=np.int64)
+    fill = np.zeros(n_players, dtype=np.int64)
+
+    win_buf = np.full((n_players, FORM_WINDOW), np.nan)
+    win_cnt = np.zeros(n_players, dtype=np.int64)
+    win_s_buf = np.full((n_players * n_surf, FORM_WINDOW), np.nan)
+    win_s_cnt = np.zeros(n_players * n_surf, dtype=np.int64)
+    win_l_buf = np.full((n_level_keys, FORM_WINDOW), np.nan)
+    win_l_cnt = np.zeros(n_level_keys, dtype=np.int64)
+    streak = np.zeros(n_players, dtype=np.int64)
+
+    st_buf = np.full((n_players, roll_n, n_stats), np.nan)
+    st_cnt = np.zeros(n_players, dtype=np.int64)
+    st_s_buf = np.full((n_players * n_surf, roll_n, n_stats), np.nan)
+    st_s_cnt = np.zeros(n_players * n_surf, dtype=np.int64)
+
+    h2h = np.zeros(n_pairs, dtype=np.int64)
+    h2h_s = np.zeros(n_spairs, dtype=np.int64)
+    t_matches = np.zeros(n_tkeys, dtype=np.int64)
+    t_minutes = np.zeros(n_tkeys, dtype=np.int64)
+
+    for i in range(n):
+        d = day[i]
+        w = wi[i]
+        l = li[i]
+        s = esurf[i]
+
+        rest_w = _rest(last, w, d)
+        rest_l = _rest(last, l, d)
+        _decay(elo_g, elo_s, w, rest_w, decay_table)
+        _decay(elo_g, elo_s, l, rest_l, decay_table)
+
+        # ---- pre-match (solo main draw) ----
+        if i >= n_qual:
+            o = i - n_qual
+            for side in range(2):
+                if side == 0:
+                    p, rest, lvl, tk, out = w, rest_w, lvl_w[i], tkey_w[i], out_w
+                else:
+                    p, rest, lvl, tk, out = l, rest_l, lvl_l[i], tkey_l[i], out_l
+
+                out[o, 0] = elo_g[p]
+                out[o, 1] = elo_s[p, s] if s >= 0 else elo_g[p]
+
+                out[o, 2] = _ring_mean(win_buf, win_cnt, p, 10, 0.5)
+                out[o, 3] = _ring_mean(win_buf, win_cnt, p, 20, 0.5)
+                out[o, 4] = streak[p]
+                out[o, 5] = _ring_mean(win_s_buf, win_s_cnt, p * n_surf + s, 20, 0.5) if s >= 0 else 0.5
+                out[o, 6] = _ring_mean(win_l_buf, win_l_cnt, lvl, 20, 0.5)
+
+                out[o, 7] = rest
+                out[o, 8] = _matches_last_days(hist, hist_start, fill, qual_count, p, d, 7)
+                out[o, 9] = _matches_last_days(hist, hist_start, fill, qual_count, p, d, 14)
+                out[o, 10] = _matches_last_days(hist, hist_start, fill, qual_count, p, d, 30)
+
+                out[o, 11] = t_matches[tk]
+                out[o, 12] = t_minutes[tk]
+
+                for j in range(n_stats):
+                    out[o, 13 + j] = _ring_mean_metric(st_buf, st_cnt, p, j, roll_n, 0.0)
+                    if s >= 0:
+                        out[o, 13 + n_stats + j] = _ring_mean_metric(st_s_buf, st_s_cnt, p * n_surf + s, j, roll_n, 0.0)
+                    else:
+                        out[o, 13 + n_stats + j] = 0.0
+
+            out_pair[o, 0] = h2h[pair[i]] * pair_sign[i]
+            out_pair[o, 1] = h2h_s[spair[i]] * pair_sign[i]
+
+        # ---- post-match (con el resultado real) ----
+        m = played[w]
+        if m < k_table.shape[0]:
+            k = k_table[m]
+        else:
+            k = K_MIN + (K_MAX - K_MIN) * math.exp(-m / K_EXP_SCALE)
+        k *= mult[i]
+
+        ra = elo_g[w]
+        rb = elo_g[l]
+        pa = 1.0 / (1.0 + 10.0 ** ((rb - ra) / 400.0))
+        elo_g[w] = ra + k * (1 - pa)
+        elo_g[l] = rb - k * (1 - pa)
+        if s >= 0:
+            rsa = elo_s[w, s]
+            rsb = elo_s[l, s]
+            psa = 1.0 / (1.0 + 10.0 ** ((rsb - rsa) / 400.0))
+            elo_s[w, s] = rsa + k * (1 - psa)
+            elo_s[l, s] = rsb - k * (1 - psa)
+        played[w] += 1
+        played[l] += 1
+
+        for p in (w, l):
+            last[p] = d
+            hist[hist_start[p] + fill[p]] = d
+            fill[p] += 1
+
+        for p, res, lvl in ((w, 1.0, lvl_w[i]), (l, 0.0, lvl_l[i])):
+            win_buf[p, win_cnt[p] % FORM_WINDOW] = res
+            win_cnt[p] += 1
+            if s >= 0:
+                ks = p * n_surf + s
+                win_s_buf[ks, win_s_cnt[ks] % FORM_WINDOW] = res
+                win_s_cnt[ks] += 1
+            win_l_buf[lvl, win_l_cnt[lvl] % FORM_WINDOW] = res
+            win_l_cnt[lvl] += 1
+
+        sw = streak[w]
+        sl = streak[l]
+        streak[w] = sw + 1 if sw >= 0 else 1
+        streak[l] = sl - 1 if sl <= 0 else -1
+
+        h2h[pair[i]] += pair_sign[i]
+        h2h_s[spair[i]] += pair_sign[i]
+
+        for p, rates in ((w, w_rates), (l, l_rates)):
+            c = st_cnt[p] % roll_n
+            for j in range(n_stats):
+                st_buf[p, c, j] = rates[i, j]
+            st_cnt[p] += 1
+            if s >= 0:
+                ks = p * n_surf + s
+                c = st_s_cnt[ks] % roll_n
+                for j in range(n_stats):
+                    st_s_buf[ks, c, j] = rates[i, j]
+                st_s_cnt[ks] += 1
+
+        t_matches[tkey_w[i]] += 1
+        t_matches[tkey_l[i]] += 1
+        if not math.isnan(minutes[i]):
+            t_minutes[tkey_w[i]] += int(minutes[i])
+            t_minutes[tkey_l[i]] += int(minutes[i])
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _rate(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    ok = (den > 0) & ~np.isnan(num)
+    return np.divide(num, den, out=np.full(len(num), np.nan), where=ok)
+
+
+def stat_rates(df: pd.DataFrame, prefix: str) -> np.ndarray:
+    """features_stats.rates_from_row vectorizado: shape (n, len(STAT_METRICS))."""
+    ace = _numeric(df, prefix + "ace")
+    dfault = _numeric(df, prefix + "df")
+    svpt = _numeric(df, prefix + "svpt")
+    first_in = _numeric(df, prefix + "1stIn")
+    first_won = _numeric(df, prefix + "1stWon")
+    second_won = _numeric(df, prefix + "2ndWon")
+    bp_saved = _numeric(df, prefix + "bpSaved")
+    bp_faced = _numeric(df, prefix + "bpFaced")
+
+    rates = {
+        "ace_rate": _rate(ace, svpt),
+        "df_rate": _rate(dfault, svpt),
+        "first_in_rate": _rate(first_in, svpt),
+        "first_won_rate": _rate(first_won, first_in),
+        "second_won_rate": _rate(second_won, svpt - first_in),
+        "bp_saved_rate": _rate(bp_saved, bp_faced),
+    }
+    return np.column_stack([rates[m] for m in STAT_METRICS])
+
+
+def _codes(values) -> Tuple[np.ndarray, int]:
+    uniq, inv = np.unique(np.asarray(values), return_inverse=True)
+    return inv.astype(np.int64), len(uniq)
+
+
+def _surfaces(df: pd.DataFrame) -> np.ndarray:
+    s = df["surface"] if "surface" in df else pd.Series([np.nan] * len(df), index=df.index)
+    return s.where(s.notna(), "Unknown").astype(str).to_numpy()
+
+
+def _levels(df: pd.DataFrame) -> List[str]:
+    # misma expresión que el replay de referencia (un NaN es truthy => "nan")
+    return [str(x or "UNK") for x in df["tourney_level"]] if "tourney_level" in df else ["UNK"] * len(df)
+
+
+def _player_columns(players_lookup: Dict[int, dict], ids: np.ndarray, days: np.ndarray) -> Dict[str, np.ndarray]:
+    uniq, inv = np.unique(ids, return_inverse=True)
+    dob = np.full(len(uniq), np.iinfo(np.int64).min)
+    height = np.full(len(uniq), np.nan)
+    lefty = np.full(len(uniq), np.nan)
+    for j, pid in enumerate(uniq.tolist()):
+        info = players_lookup.get(pid)
+        if not info:
+            continue
+        b = info.get("dob")
+        if b is not None and not pd.isna(b):
+            dob[j] = pd.Timestamp(b).value // (86400 * 10**9)
+        h = info.get("height", np.nan)
+        if h is not None and not pd.isna(h):
+            height[j] = float(h)
+        hand = info.get("hand")
+        if not (hand is None or (isinstance(hand, float) and np.isnan(hand))):
+            lefty[j] = 1.0 if hand == "L" else 0.0
+
+    has_dob = dob[inv] != np.iinfo(np.int64).min
+    age = np.full(len(ids), np.nan)
+    age[has_dob] = (days[has_dob] - dob[inv][has_dob]) / 365.25
+    return {"age": age, "height": height[inv], "lefty": lefty[inv]}
+
+
+def replay_arrays(
+    df_main: pd.DataFrame,
+    df_qual_for_updates: Optional[pd.DataFrame],
+    players_lookup: Dict[int, dict],
+    rank_hist,
+    use,
+    default_rank_impute: int = 2000,
+    default_rp_impute: int = 0,
+    roll_n: int = 20,
+    compiled: bool = True,
+):
+    """
+    Mismo contrato que build_dataset.replay_online: (context, winner, loser, pair).
+    compiled=False corre el kernel en Python puro aunque Numba esté instalado.
+    """
+    from build_dataset import CONTEXT_COLUMNS, PAIR_FEATURES, SIDE_FEATURES
+
+    use = set(use)
+    has_qual = df_qual_for_updates is not None and not df_qual_for_updates.empty
+    df = pd.concat([df_qual_for_updates, df_main], ignore_index=True) if has_qual else df_main.reset_index(drop=True)
+    n_qual = len(df_qual_for_updates) if has_qual else 0
+    n = len(df)
+    n_main = n - n_qual
+
+    # ---- codificación entera ----
+    day = np.asarray(pd.DatetimeIndex(df["tourney_date"]), dtype="datetime64[D]").astype(np.int64)
+    w_ids = df["winner_id"].to_numpy(dtype=np.int64)
+    l_ids = df["loser_id"].to_numpy(dtype=np.int64)
+    pid_code, n_players = _codes(np.concatenate([w_ids, l_ids]))
+    wi, li = pid_code[:n], pid_code[n:]
+
+    surface = _surfaces(df)
+    esurf = np.array([ELO_SURFACES.index(s) if s in SURFACES else -1 for s in surface], dtype=np.int64)
+
+    levels = _levels(df)
+    lvl_code, n_levels = _codes(levels)
+    lvl_w = wi * n_levels + lvl_code
+    lvl_l = li * n_levels + lvl_code
+    mult = np.array([LEVEL_MULT.get(lv, 1.0) for lv in levels], dtype=float)
+
+    p_min = np.minimum(w_ids, l_ids)
+    p_max = np.maximum(w_ids, l_ids)
+    pair, n_pairs = _codes((p_min.astype(object) * (1 << 32) + p_max).astype(np.int64) if n else p_min)
+    pair_sign = np.where(w_ids == p_min, 1, -1).astype(np.int64)
+    surf_code, n_surf_codes = _codes(surface)
+    spair, n_spairs = _codes(surf_code * n_pairs + pair)
+
+    tids = df["tourney_id"].astype(str).to_numpy() if n else np.array([], dtype=str)
+    tid_code, _ = _codes(tids)
+    tkeys, n_tkeys = _codes(np.concatenate([tid_code * n_players + wi, tid_code * n_players + li]))
+    tkey_w, tkey_l = tkeys[:n], tkeys[n:]
+
+    minutes = _numeric(df, "minutes")
+    w_rates = stat_rates(df, "w_")
+    l_rates = stat_rates(df, "l_")
+
+    appearances = np.bincount(pid_code, minlength=n_players)
+    hist_start = np.concatenate([[0], np.cumsum(appearances)]).astype(np.int64)
+    qual_count = np.bincount(np.concatenate([wi[:n_qual], li[:n_qual]]), minlength=n_players).astype(np.int64)
+
+    out_w = np.empty((n_main, len(KERNEL_COLUMNS)))
+    out_l = np.empty((n_main, len(KERNEL_COLUMNS)))
+    out_pair = np.empty((n_main, 2))
+
+    loop = _online_loop if compiled else getattr(_online_loop, "py_func", _online_loop)
+    loop(
+        day, wi, li, n_qual, esurf, lvl_w, lvl_l, mult, pair, pair_sign, spair, tkey_w, tkey_l, minutes,
+        w_rates, l_rates, n_players, n_players * n_levels, n_pairs, n_spairs, n_tkeys, hist_start, qual_count,
+        np.asarray(K_TABLE, dtype=float), np.asarray(DECAY_TABLE, dtype=float), roll_n, out_w, out_l, out_pair,
+    )
+
+    # ---- columnas de salida (solo main draw) ----
+    main = df.iloc[n_qual:]
+    main_day = day[n_qual:]
+    w_main, l_main = w_ids[n_qual:], l_ids[n_qual:]
+
+    rounds = main["round"].where(main["round"].notna(), "UNK") if "round" in main else pd.Series(["UNK"] * n_main)
+    context = {
+        "date": np.asarray(pd.DatetimeIndex(main["tourney_date"])),
+        "tourney_id": tids[n_qual:].astype(object),
+        "tourney_level": np.array(levels[n_qual:], dtype=object),
+        "surface": surface[n_qual:].astype(object),
+        "round": rounds.to_numpy(dtype=object),
+        "best_of": _numeric(main, "best_of"),
+    }
+    assert tuple(context) == CONTEXT_COLUMNS
+
+    winner = {
+        "id": w_main,
+        "seed": _numeric(main, "winner_seed"),
+        "entry": entry_strings(main["winner_entry"].to_numpy(dtype=object) if "winner_entry" in main else [None] * n_main),
+    }
+    loser = {
+        "id": l_main,
+        "seed": _numeric(main, "loser_seed"),
+        "entry": entry_strings(main["loser_entry"].to_numpy(dtype=object) if "loser_entry" in main else [None] * n_main),
+    }
+
+    for j, c in enumerate(KERNEL_COLUMNS):
+        dtype = np.int64 if c in INT_COLUMNS else float
+        winner[c] = out_w[:, j].astype(dtype)
+        loser[c] = out_l[:, j].astype(dtype)
+    pair_cols = {"h2h": out_pair[:, 0].astype(np.int64), "h2h_surface": out_pair[:, 1].astype(np.int64)}
+
+    if "player" in use:
+        for side, ids in ((winner, w_main), (loser, l_main)):
+            side.update(_player_columns(players_lookup, ids, main_day))
+
+    if "rank" in use:
+        index = build_rank_index(rank_hist)
+        for side, ids, pref in ((winner, w_main, "winner"), (loser, l_main, "loser")):
+            rank = _numeric(main, f"{pref}_rank")
+            rp = _numeric(main, f"{pref}_rank_points")
+            side["rank"] = np.where(np.isnan(rank), float(default_rank_impute), rank)
+            side["rank_points"] = np.where(np.isnan(rp), float(default_rp_impute), rp)
+            for weeks in (4, 8):
+                side[f"rank_d{weeks}"], side[f"rank_points_d{weeks}"] = rank_delta_weeks_array(index, ids, main_day, weeks)
+
+    if "glicko" in use:
+        g_w, g_l = _glicko_columns(day, w_ids, l_ids, n_qual)
+        winner.update(g_w)
+        loser.update(g_l)
+
+    # solo los grupos pedidos
+    keep = {"id", "seed", "entry"} | {f for g, sides in SIDE_FEATURES.items() if g in use for f in sides}
+    winner = {k: v for k, v in winner.items() if k in keep}
+    loser = {k: v for k, v in loser.items() if k in keep}
+    pair_out = {f: pair_cols[f] for g, feats in PAIR_FEATURES.items() if g in use for f in feats}
+    return context, winner, loser, pair_out
+
+
+def _glicko_columns(day: np.ndarray, w_ids: np.ndarray, l_ids: np.ndarray, n_qual: int):
+    """
+    Glicko-2 es por períodos vectorizados; el loop que queda es solo de lecturas.
+    Las qualies (primeras n_qual filas) se intercalan por fecha con el main draw,
+    igual que en replay_online: cada una entra al período que le corresponde.
+    """
+    glicko = Glicko2State()
+    dates = pd.to_datetime(day.astype("datetime64[D]"))
+    n_main = len(day) - n_qual
+    cols = {k: np.empty(n_main) for k in ("gw", "rw", "gl", "rl")}
+    w_list, l_list = w_ids.tolist(), l_ids.tolist()
+
+    q = 0
+    for o in range(n_main):
+        i = n_qual + o
+        while q < n_qual and day[q] <= day[i]:
+            glicko.advance(dates[q])
+            glicko.add_match(w_list[q], l_list[q])
+            q += 1
+        w, l = w_list[i], l_list[i]
+        glicko.advance(dates[i])
+        cols["gw"][o], cols["rw"][o] = glicko.get(w), glicko.rd(w)
+        cols["gl"][o], cols["rl"][o] = glicko.get(l), glicko.rd(l)
+        glicko.add_match(w, l)
+
+    return {"glicko": cols["gw"], "glicko_rd": cols["rw"]}, {"glicko": cols["gl"], "glicko_rd": cols["rl"]}
+
+
+def compare_replays(ref, fast) -> List[str]:
+    """Columnas que difieren entre dos ReplayColumns (vacío = idénticos)."""
+    bad = []
+    for part, (a, b) in zip(("context", "winner", "loser", "pair"), zip(ref, fast)):
+        if set(a) != set(b):
+            bad.append(f"{part}: columnas {sorted(set(a) ^ set(b))}")
+        for c in sorted(set(a) & set(b)):
+            x, y = np.asarray(a[c]), np.asarray(b[c])
+            if x.dtype.kind != y.dtype.kind:
+                bad.append(f"{part}.{c}: dtype {x.dtype} vs {y.dtype}")
+            elif x.dtype.kind == "f":
+                if not np.array_equal(x, y, equal_nan=True):
+                    bad.append(f"{part}.{c}")
+            elif x.dtype.kind == "M":
+                if not np.array_equal(x.astype("datetime64[ns]"), y.astype("datetime64[ns]")):
+                    bad.append(f"{part}.{c}")
+            elif not np.array_equal(x.astype(str), y.astype(str)) if x.dtype == object else not np.array_equal(x, y):
+                bad.append(f"{part}.{c}")
+    return bad
+
+
+def check_synthetic_parity(cfg=None, qual_rounds=("R128",), compiled: bool = True) -> List[str]:
+    """
+    Paridad referencia vs kernel sobre un set sintético chico (sin datos descargados).
+    Los rounds de qual_rounds se usan como qualies (solo updates). Devuelve compare_replays.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from build_dataset import FEATURE_GROUPS, replay_online
+    from download import load_matches
+    from rankings import build_rank_hist, load_rankings
+    from synthetic import SyntheticConfig, generate
+    from utils import load_players_lookup
+
+    cfg = cfg or SyntheticConfig(year_from=2020, year_to=2021, n_players=300, matches_per_year=400, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = Path(tmp)
+        generate(cfg, raw)
+        df = load_matches(cfg.year_from, cfg.year_to, raw_dir=raw)
+        players = load_players_lookup(raw)
+        rank_hist = build_rank_hist(load_rankings(cfg.year_from, cfg.year_to, raw_dir=raw))
+
+    is_qual = df["round"].isin(list(qual_rounds))
+    df_main = df[~is_qual].reset_index(drop=True)
+    df_qual = df[is_qual].reset_index(drop=True)
+    use = set(FEATURE_GROUPS)
+    ref = replay_online(df_main, df_qual, players, rank_hist, use)
+    fast = replay_arrays(df_main, df_qual, players, rank_hist, use, compiled=compiled)
+    return compare_replays(ref, fast)
+
+
+def main() -> None:
+    """Chequeo de paridad: replay de referencia vs kernel sobre los mismos datos."""
+    from build_dataset import FEATURE_GROUPS, replay_online
+    from download import load_matches
+    from rankings import build_rank_hist, load_rankings
+    from utils import load_players_lookup
+
+    ap = argparse.ArgumentParser(description="Compara backend jit vs replay de referencia.")
+    ap.add_argument("--year-from", type=int, required=True)
+    ap.add_argument("--year-to", type=int, required=True)
+    ap.add_argument("--qual-rounds", type=str, default="", help="Rounds a tratar como qualies (solo updates), ej. R128")
+    args = ap.parse_args()
+
+    df = load_matches(args.year_from, args.year_to)
+    qual_rounds = {r for r in args.qual_rounds.split(",") if r}
+    is_qual = df["round"].astype(str).str.startswith("Q", na=False) | df["round"].isin(qual_rounds)
+    df_main = df[~is_qual].reset_index(drop=True)
+    df_qual = df[is_qual].reset_index(drop=True)
+    players = load_players_lookup()
+    rank_hist = build_rank_hist(load_rankings(args.year_from, args.year_to))
+    use = set(FEATURE_GROUPS)
+
+    t0 = time.perf_counter()
+    ref = replay_online(df_main, df_qual, players, rank_hist, use)
+    t1 = time.perf_counter()
+    fast = replay_arrays(df_main, df_qual, players, rank_hist, use)
+    t2 = time.perf_counter()
+
+    bad = compare_replays(ref, fast)
+    print(f"numba: {HAVE_NUMBA} | partidos: {len(df_main)} main + {len(df_qual)} qual")
+    print(f"referencia: {t1 - t0:.1f}s | jit: {t2 - t1:.1f}s")
+    print("OK: idénticos" if not bad else "DIFERENCIAS:\n  " + "\n  ".join(bad))
+    if bad:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
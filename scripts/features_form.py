@@ -3,30 +3,49 @@ features_form.py
 
 Features de "forma" (momentum) calculadas SOLO con historia previa.
 El estado se actualiza post-match.
+
+La historia de resultados vive en un RollingWindowStore con claves
+pid, (pid, superficie) y (pid, nivel), ver rolling.py.
 """
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, Hashable, Optional
+
+from rolling import RollingWindowStore, level_key, surface_key
+
+FORM_WINDOW = 20
+
 
-import numpy as np
+def new_win_hist(window: int = FORM_WINDOW) -> RollingWindowStore:
+    return RollingWindowStore(["win"], window=window)
 
 
-def winrate_last(win_hist: Dict[int, List[int]], pid: int, n: int, default: float = 0.5) -> float:
-    h = win_hist.get(pid, [])
-    if not h:
-        return default
-    tail = h[-n:]
-    return float(np.mean(tail)) if tail else default
+def winrate_last(win_hist: RollingWindowStore, key: Hashable, n: int, default: float = 0.5) -> float:
+    return win_hist.mean1(key, n, default)
 
 
 def get_streak(streak: Dict[int, int], pid: int) -> int:
     return int(streak.get(pid, 0))
 
 
-def update_form_post_match(win_hist: Dict[int, List[int]], streak: Dict[int, int], winner: int, loser: int) -> None:
-    win_hist.setdefault(winner, []).append(1)
-    win_hist.setdefault(loser, []).append(0)
+def update_form_post_match(
+    win_hist: RollingWindowStore,
+    streak: Dict[int, int],
+    winner: int,
+    loser: int,
+    surface: Optional[str] = None,
+    level: Optional[str] = None,
+) -> None:
+    win_hist.push(winner, 1.0)
+    win_hist.push(loser, 0.0)
+
+    if surface is not None:
+        win_hist.push(surface_key(winner, surface), 1.0)
+        win_hist.push(surface_key(loser, surface), 0.0)
+    if level is not None:
+        win_hist.push(level_key(winner, level), 1.0)
+        win_hist.push(level_key(loser, level), 0.0)
 
     sw = streak.get(winner, 0)
     sl = streak.get(loser, 0)
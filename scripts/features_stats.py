@@ -6,15 +6,29 @@ Stats históricas (rolling) de servicio/devolución.
 Se calculan desde columnas post-match del CSV (w_*, l_*),
 pero se usan SOLO como promedios de partidos anteriores (rolling pre-match).
 Luego se actualizan post-match agregando las rates de este partido.
+
+La historia vive en un RollingWindowStore (una columna por métrica) con claves
+pid y (pid, superficie), ver rolling.py.
 """
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, Hashable, Optional
 
 import numpy as np
 import pandas as pd
 
+from rolling import RollingWindowStore, surface_key
+
+STAT_METRICS = (
+    "ace_rate",
+    "df_rate",
+    "first_in_rate",
+    "first_won_rate",
+    "second_won_rate",
+    "bp_saved_rate",
+)
+
 
 def _safe_float(x):
     try:
@@ -59,24 +73,36 @@ def rates_from_row(is_winner: bool, r: pd.Series) -> Dict[str, float]:
     }
 
 
-def stat_avg(stats_hist: Dict[int, Dict[str, List[float]]], pid: int, metric: str, n: int = 20, default: float = 0.0) -> float:
-    h = stats_hist.get(pid, {}).get(metric, [])
-    if not h:
-        return default
-    tail = [v for v in h[-n:] if v is not None and not (isinstance(v, float) and np.isnan(v))]
-    if not tail:
-        return default
-    return float(np.mean(tail))
+def new_stats_hist(window: int = 20) -> RollingWindowStore:
+    return RollingWindowStore(STAT_METRICS, window=window)
+
 
+def stat_avgs(stats_hist: RollingWindowStore, key: Hashable, n: int = 20, default: float = 0.0) -> Dict[str, float]:
+    """Todas las métricas de una sola vez (una lectura del store por clave)."""
+    means = stats_hist.mean(key, n, default)
+    return dict(zip(STAT_METRICS, means.tolist()))
 
-def update_stats_post_match(stats_hist: Dict[int, Dict[str, List[float]]], winner: int, loser: int, r: pd.Series) -> None:
+
+def stat_avg(stats_hist: RollingWindowStore, key: Hashable, metric: str, n: int = 20, default: float = 0.0) -> float:
+    return stat_avgs(stats_hist, key, n=n, default=default)[metric]
+
+
+def update_stats_post_match(
+    stats_hist: RollingWindowStore,
+    winner: int,
+    loser: int,
+    r: pd.Series,
+    surface: Optional[str] = None,
+) -> None:
     w_rates = rates_from_row(True, r)
     l_rates = rates_from_row(False, r)
 
-    stats_hist.setdefault(winner, {})
-    stats_hist.setdefault(loser, {})
+    w_vals = [w_rates[k] for k in STAT_METRICS]
+    l_vals = [l_rates[k] for k in STAT_METRICS]
+
+    stats_hist.push(winner, w_vals)
+    stats_hist.push(loser, l_vals)
 
-    for k, v in w_rates.items():
-        stats_hist[winner].setdefault(k, []).append(v)
-    for k, v in l_rates.items():
-        stats_hist[loser].setdefault(k, []).append(v)
+    if surface is not None:
+        stats_hist.push(surface_key(winner, surface), w_vals)
+        stats_hist.push(surface_key(loser, surface), l_vals)
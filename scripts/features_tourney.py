@@ -0,0 +1,64 @@
+"""
+features_tourney.py
+
+Carga del torneo (partidos y minutos jugados en el torneo actual),
+calculada SOLO con partidos anteriores del mismo torneo.
+
+Solo se guardan los torneos abiertos: cuando el stream avanza más allá de la
+ventana de fechas de un torneo, sus entradas se descartan. La memoria queda
+acotada por los torneos simultáneos, no por la longitud de la historia.
+Las qualies de --use-qual-for-elo también entran intercaladas por fecha con el
+main draw (replay_online), nunca todas de antemano.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Un torneo sigue "abierto" hasta tourney_date + TOURNEY_WINDOW_DAYS
+# (en Sackmann todos los partidos de un torneo comparten tourney_date).
+TOURNEY_WINDOW_DAYS = 14
+
+
+class TourneyLoadTracker:
+    def __init__(self, window_days: int = TOURNEY_WINDOW_DAYS):
+        self.window = pd.Timedelta(days=window_days)
+        # tid -> fecha del torneo / pid -> [partidos, minutos]
+        self.start: Dict[str, pd.Timestamp] = {}
+        self.load: Dict[str, Dict[int, List[int]]] = {}
+        self.now: Optional[pd.Timestamp] = None
+
+    def __len__(self) -> int:
+        return len(self.load)
+
+    def advance(self, date: pd.Timestamp) -> None:
+        """Cierra los torneos cuya ventana ya quedó atrás del stream."""
+        if self.now is not None and date <= self.now:
+            return
+        self.now = date
+
+        expired = [tid for tid, d in self.start.items() if d + self.window < date]
+        for tid in expired:
+            del self.start[tid]
+            del self.load[tid]
+
+    def matches_so_far(self, tid: str, pid: int) -> int:
+        return self.load.get(tid, {}).get(pid, (0, 0))[0]
+
+    def minutes_so_far(self, tid: str, pid: int) -> int:
+        return self.load.get(tid, {}).get(pid, (0, 0))[1]
+
+    def update_post_match(self, tid: str, date: pd.Timestamp, winner: int, loser: int, minutes: float) -> None:
+        if tid not in self.load:
+            self.start[tid] = date
+            self.load[tid] = {}
+        players = self.load[tid]
+
+        add = 0 if np.isnan(minutes) else int(minutes)
+        for pid in (winner, loser):
+            cur = players.setdefault(pid, [0, 0])
+            cur[0] += 1
+            cur[1] += add
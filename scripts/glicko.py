@@ -0,0 +1,184 @@
+"""
+glicko.py
+
+Rating por períodos estilo Glicko-2 (Glickman, "Example of the Glicko-2 system").
+
+A diferencia de EloState (update secuencial por partido), todos los partidos de
+un período (PERIOD_DAYS) se evalúan contra los ratings congelados al inicio del
+período, así que el update del período completo es una sola pasada vectorizada
+sobre los arrays de partidos. Pre-match se leen siempre los ratings del último
+período cerrado: no hay leakage dentro del período.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+GLICKO_BASE = 1500.0
+GLICKO_SCALE = 173.7178  # 400 / ln(10)
+
+RD_INIT = 350.0
+SIGMA_INIT = 0.06
+TAU = 0.5
+CONVERGENCE_EPS = 1e-6
+
+PERIOD_DAYS = 7
+
+PHI_INIT = RD_INIT / GLICKO_SCALE
+
+
+def _g(phi: np.ndarray) -> np.ndarray:
+    return 1.0 / np.sqrt(1.0 + 3.0 * phi ** 2 / np.pi ** 2)
+
+
+def _new_sigma(sigma, phi, v, delta, tau: float, max_iter: int = 100) -> np.ndarray:
+    """Paso 5 de Glicko-2 (método Illinois), vectorizado sobre jugadores."""
+    a = np.log(sigma ** 2)
+    phi2 = phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta ** 2 - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    A = a.copy()
+    big = delta ** 2 > phi2 + v
+    B = np.where(big, np.log(np.where(big, delta ** 2 - phi2 - v, 1.0)), a - tau)
+
+    # si delta^2 <= phi^2 + v: B = a - k*tau con el primer k tal que f(B) >= 0
+    k = np.ones_like(a)
+    need = ~big & (f(B) < 0)
+    for _ in range(max_iter):
+        if not need.any():
+            break
+        k[need] += 1
+        B = np.where(need, a - k * tau, B)
+        need &= f(B) < 0
+
+    fA, fB = f(A), f(B)
+    active = np.abs(B - A) > CONVERGENCE_EPS
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = fC * fB <= 0
+        A = np.where(active & swap, B, A)
+        fA = np.where(active & swap, fB, np.where(active, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active &= np.abs(B - A) > CONVERGENCE_EPS
+
+    return np.exp(A / 2.0)
+
+
+class Glicko2State:
+    """
+    Misma interfaz de lectura que EloState (get / win_prob) más rd().
+    El rating es global: `surface` se acepta por compatibilidad y se ignora.
+    """
+
+    def __init__(self, period_days: int = PERIOD_DAYS, tau: float = TAU, capacity: int = 1024):
+        self.period = pd.Timedelta(days=period_days)
+        self.tau = tau
+        self.period_start: Optional[pd.Timestamp] = None
+
+        self._slots: Dict[int, int] = {}
+        self.mu = np.zeros(capacity)
+        self.phi = np.full(capacity, PHI_INIT)
+        self.sigma = np.full(capacity, SIGMA_INIT)
+
+        self._winners: List[int] = []
+        self._losers: List[int] = []
+
+    def _slot(self, pid: int) -> int:
+        slot = self._slots.get(pid)
+        if slot is not None:
+            return slot
+
+        slot = len(self._slots)
+        if slot == len(self.mu):
+            grow = len(self.mu)
+            self.mu = np.concatenate([self.mu, np.zeros(grow)])
+            self.phi = np.concatenate([self.phi, np.full(grow, PHI_INIT)])
+            self.sigma = np.concatenate([self.sigma, np.full(grow, SIGMA_INIT)])
+        self._slots[pid] = slot
+        return slot
+
+    @staticmethod
+    def win_prob(ra: float, rb: float, rd_b: float = 0.0) -> float:
+        """P(a gana). Con rd_b = 0 coincide con EloState.win_prob."""
+        g = _g(np.asarray(rd_b / GLICKO_SCALE))
+        return float(1.0 / (1.0 + np.exp(-g * (ra - rb) / GLICKO_SCALE)))
+
+    def get(self, pid: int, surface: Optional[str] = None) -> float:
+        slot = self._slots.get(pid)
+        return GLICKO_BASE if slot is None else GLICKO_BASE + GLICKO_SCALE * float(self.mu[slot])
+
+    def rd(self, pid: int) -> float:
+        slot = self._slots.get(pid)
+        return RD_INIT if slot is None else GLICKO_SCALE * float(self.phi[slot])
+
+    def add_match(self, winner: int, loser: int) -> None:
+        """Registra el resultado en el período abierto (se aplica al cerrarlo)."""
+        self._winners.append(self._slot(winner))
+        self._losers.append(self._slot(loser))
+
+    def advance(self, date: pd.Timestamp) -> None:
+        """Cierra el período abierto (y los vacíos intermedios) si `date` ya cae fuera."""
+        if self.period_start is None:
+            self.period_start = date
+            return
+        elapsed = (date - self.period_start) // self.period
+        if elapsed <= 0:
+            return
+
+        self._rate_period()
+        if elapsed > 1:
+            self._inflate(np.ones(len(self._slots), dtype=bool), elapsed - 1)
+        self.period_start += elapsed * self.period
+
+    def _inflate(self, mask: np.ndarray, periods: int = 1) -> None:
+        n = len(mask)
+        phi, sigma = self.phi[:n], self.sigma[:n]
+        phi[mask] = np.minimum(np.sqrt(phi[mask] ** 2 + periods * sigma[mask] ** 2), PHI_INIT)
+
+    def _rate_period(self) -> None:
+        n = len(self._slots)
+        if not self._winners:
+            self._inflate(np.ones(n, dtype=bool))
+            return
+
+        w = np.array(self._winners, dtype=np.int64)
+        l = np.array(self._losers, dtype=np.int64)
+        self._winners, self._losers = [], []
+
+        # cada partido aporta una observación por jugador, contra ratings congelados
+        p = np.concatenate([w, l])
+        o = np.concatenate([l, w])
+        s = np.concatenate([np.ones(len(w)), np.zeros(len(l))])
+
+        mu, phi, sigma = self.mu[:n], self.phi[:n], self.sigma[:n]
+        g = _g(phi[o])
+        e = 1.0 / (1.0 + np.exp(-g * (mu[p] - mu[o])))
+
+        v_inv = np.bincount(p, weights=g ** 2 * e * (1.0 - e), minlength=n)
+        score = np.bincount(p, weights=g * (s - e), minlength=n)
+
+        played = v_inv > 0
+        idx = np.flatnonzero(played)
+        v = 1.0 / v_inv[idx]
+        delta = v * score[idx]
+
+        new_sigma = _new_sigma(sigma[idx], phi[idx], v, delta, self.tau)
+        phi_star = np.sqrt(phi[idx] ** 2 + new_sigma ** 2)
+        new_phi = 1.0 / np.sqrt(1.0 / phi_star ** 2 + 1.0 / v)
+
+        mu[idx] = mu[idx] + new_phi ** 2 * score[idx]
+        phi[idx] = new_phi
+        sigma[idx] = new_sigma
+
+        # quien no jugó en el período solo gana incertidumbre
+        self._inflate(~played)
@@ -1,16 +1,24 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-from utils import RAW_ATP_DIR, parse_yyyymmdd
+from utils import RAW_ATP_DIR, key_player, parse_yyyymmdd, player_day_keys
+from validation import ValidationReport, validate_rankings
 
 
-def load_rankings(year_from: int, year_to: int) -> pd.DataFrame:
+def load_rankings(
+    year_from: int,
+    year_to: int,
+    raw_dir: Path = RAW_ATP_DIR,
+    prefix: str = "atp_rankings_",
+    report: Optional[ValidationReport] = None,
+) -> pd.DataFrame:
     """
-    Load weekly ATP rankings and keep only relevant years.
+    Load weekly ATP rankings, keep only relevant years and validate them (see validation.py).
     """
     parts = []
-    for p in RAW_ATP_DIR.glob("atp_rankings_*.csv"):
+    for p in raw_dir.glob(f"{prefix}*.csv"):
         df = pd.read_csv(p)
         df["ranking_date"] = df["ranking_date"].apply(parse_yyyymmdd)
         df = df[
@@ -23,6 +31,7 @@ def load_rankings(year_from: int, year_to: int) -> pd.DataFrame:
         return pd.DataFrame()
 
     out = pd.concat(parts, ignore_index=True)
+    out = validate_rankings(out, report)
     out = out.rename(columns={"player": "player_id", "points": "rank_points"})
     return out.sort_values(["player_id", "ranking_date"])
 
@@ -62,3 +71,45 @@ def rank_delta_weeks(hist, date, weeks: int):
         return np.nan, np.nan
 
     return cur[0] - past[0], cur[1] - past[1]
+
+
+def build_rank_index(hist: Dict[int, List[Tuple[pd.Timestamp, int, int]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """rank_hist aplanado en arrays (keys ordenadas, rank, points) para rank_delta_weeks_array."""
+    pids, dates, ranks, points = [], [], [], []
+    for pid, entries in hist.items():
+        for d, r, p in entries:
+            pids.append(pid)
+            dates.append(d)
+            ranks.append(r)
+            points.append(p)
+
+    days = np.asarray(pd.DatetimeIndex(dates), dtype="datetime64[D]").astype(np.int64)
+    keys = player_day_keys(np.asarray(pids, dtype=np.int64), days)
+    order = np.argsort(keys, kind="mergesort")
+    return keys[order], np.asarray(ranks, dtype=float)[order], np.asarray(points, dtype=float)[order]
+
+
+def rank_delta_weeks_array(index, pids: np.ndarray, days: np.ndarray, weeks: int):
+    """
+    Versión vectorizada de rank_delta_weeks: pids y días (enteros desde epoch)
+    alineados, devuelve (delta rank, delta points) con NaN donde falta historia.
+    """
+    keys, ranks, points = index
+
+    def last_before(d: np.ndarray) -> np.ndarray:
+        # último registro del mismo jugador con fecha estrictamente anterior a d
+        q = player_day_keys(pids, d)
+        pos = np.searchsorted(keys, q, side="left") - 1
+        ok = pos >= 0
+        ok[ok] = key_player(keys[pos[ok]]) == pids[ok]
+        return np.where(ok, pos, -1)
+
+    cur = last_before(days)
+    past = last_before(days - 7 * weeks)
+    ok = (cur >= 0) & (past >= 0)
+
+    d_rank = np.full(len(pids), np.nan)
+    d_points = np.full(len(pids), np.nan)
+    d_rank[ok] = ranks[cur[ok]] - ranks[past[ok]]
+    d_points[ok] = points[cur[ok]] - points[past[ok]]
+    return d_rank, d_points
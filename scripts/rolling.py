@@ -0,0 +1,146 @@
+"""
+rolling.py
+
+Store genérico de ventanas rolling por clave.
+
+Cada clave (jugador, (jugador, superficie), (jugador, nivel), ...) tiene un slot
+en un único array contiguo de forma (slots, window, metrics); el offset de la
+clave es slot * window. Los valores se escriben como ring buffer, así que
+agregar una dimensión nueva de ventana no crea objetos Python por partido:
+solo un slot la primera vez que aparece la clave.
+
+Los stores de una sola métrica (resultados 0/1 de forma) además llevan sumas
+acumuladas por slot, así que mean1 es O(1) con aritmética escalar, sin armar
+arrays por lectura.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def surface_key(pid: int, surface: str) -> Tuple[str, int, str]:
+    return ("surface", pid, surface)
+
+
+def level_key(pid: int, level: str) -> Tuple[str, int, str]:
+    return ("level", pid, level)
+
+
+class RollingWindowStore:
+    """
+    Últimos `window` valores de cada métrica por clave.
+    Los NaN se guardan (cuentan como partido jugado) pero se ignoran en las medias.
+    """
+
+    def __init__(self, metrics: Sequence[str], window: int, capacity: int = 1024):
+        self.metrics = tuple(metrics)
+        self.window = int(window)
+        self._slots: Dict[Hashable, int] = {}
+        self._values = np.full((capacity, self.window, len(self.metrics)), np.nan)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._counts: List[int] = []  # espejo de _count como ints de Python (lecturas escalares)
+
+        # una métrica: por slot, suma y cantidad de valores válidos acumuladas en un
+        # ring de window + 1 (posición c = después de c pushes). Exacto para enteros (0/1).
+        self._scalar = len(self.metrics) == 1
+        self._cum_sum: List[List[float]] = []
+        self._cum_valid: List[List[int]] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def _slot(self, key: Hashable) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+
+        slot = len(self._slots)
+        if slot == len(self._count):
+            # crecimiento geométrico: copia amortizada O(1) por clave nueva
+            cap = 2 * len(self._count)
+            values = np.full((cap, self.window, len(self.metrics)), np.nan)
+            values[:slot] = self._values
+            count = np.zeros(cap, dtype=np.int64)
+            count[:slot] = self._count
+            self._values, self._count = values, count
+
+        self._slots[key] = slot
+        self._counts.append(0)
+        if self._scalar:
+            self._cum_sum.append([0.0] * (self.window + 1))
+            self._cum_valid.append([0] * (self.window + 1))
+        return slot
+
+    def push(self, key: Hashable, values) -> None:
+        slot = self._slot(key)
+        c = self._counts[slot]
+        self._values[slot, c % self.window] = values
+        self._count[slot] = c + 1
+        self._counts[slot] = c + 1
+
+        if self._scalar:
+            v = float(values[0]) if isinstance(values, (list, tuple, np.ndarray)) else float(values)
+            ring = self.window + 1
+            sums, valid = self._cum_sum[slot], self._cum_valid[slot]
+            ok = v == v  # no NaN
+            sums[(c + 1) % ring] = sums[c % ring] + (v if ok else 0.0)
+            valid[(c + 1) % ring] = valid[c % ring] + ok
+
+    def count(self, key: Hashable) -> int:
+        slot = self._slots.get(key)
+        return 0 if slot is None else self._counts[slot]
+
+    def tail(self, key: Hashable, n: int) -> np.ndarray:
+        """Últimos n valores (orden cronológico), shape (<=n, metrics)."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return self._values[:0, 0]
+
+        c = self._counts[slot]
+        n = min(n, c, self.window)
+        start = (c - n) % self.window
+        ring = self._values[slot]
+        if start + n <= self.window:
+            return ring[start:start + n]
+        return np.concatenate((ring[start:], ring[:start + n - self.window]))
+
+    def mean1(self, key: Hashable, n: int, default: float) -> float:
+        """mean() para stores de una métrica, como float (O(1), sin arrays)."""
+        if not self._scalar:
+            return float(self.mean(key, n, default)[0])
+        slot = self._slots.get(key)
+        if slot is None:
+            return float(default)
+
+        c = self._counts[slot]
+        n = min(n, c, self.window)
+        ring = self.window + 1
+        hi, lo = c % ring, (c - n) % ring
+        valid = self._cum_valid[slot]
+        k = valid[hi] - valid[lo]
+        if k == 0:
+            return float(default)
+        sums = self._cum_sum[slot]
+        return (sums[hi] - sums[lo]) / k
+
+    def mean(self, key: Hashable, n: int, default: float) -> np.ndarray:
+        """Media de los últimos n valores válidos por métrica (default si no hay)."""
+        if self._scalar:
+            return np.array([self.mean1(key, n, default)])
+        block = self.tail(key, n)
+        out = np.full(len(self.metrics), float(default))
+        if not len(block):
+            return out
+
+        valid = ~np.isnan(block)
+        cnt = valid.sum(axis=0)
+        tot = np.where(valid, block, 0.0).sum(axis=0)
+        has = cnt > 0
+        out[has] = tot[has] / cnt[has]
+        return out
@@ -0,0 +1,226 @@
+"""
+snapshots.py
+
+Snapshots periódicos del estado online de cada jugador (Elo por superficie,
+partidos jugados, racha, forma, stats rolling) durante el replay de build_dataset.
+
+- SnapshotRecorder: cada `every_days` guarda una fila por jugador que cambió
+  desde el snapshot anterior. Un snapshot con fecha S tiene el estado ANTES de
+  los partidos con fecha >= S. Además lleva un log de deltas: el estado de
+  cada jugador después de cada uno de sus partidos del main draw.
+- SnapshotIndex: store columnar (npz) ordenado por (player_id, fecha).
+  as_of(player_ids, date) busca el snapshot más cercano <= date de cada
+  jugador con un searchsorted vectorizado, lo avanza con el último delta en
+  [snapshot, date) y re-aplica el decay de Elo por inactividad hasta `date`.
+  El resultado es el estado antes de los partidos con fecha >= date (en
+  Sackmann, todos los de un torneo comparten tourney_date: es el estado
+  pre-match de la primera ronda que juega el jugador ese torneo).
+
+Con --use-qual-for-elo las qualies se aplican todas antes del main draw (así
+funciona ese flag para el dataset): los valores del store las incluyen igual
+que las features, pero no generan deltas ni cuentan como último partido.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from elo import DECAY_START_DAYS, DECAY_TABLE, DECAY_TABLE_DAYS, ELO_BASE, SURFACES
+from features_stats import STAT_METRICS
+from utils import player_day_keys
+
+ELO_COLUMNS = ("elo",) + tuple(f"elo_{s}" for s in sorted(SURFACES))
+SNAPSHOT_COLUMNS = ELO_COLUMNS + ("matches_played", "streak", "wr10", "wr20") + STAT_METRICS
+
+_DECAY = np.asarray(DECAY_TABLE)
+
+
+def _days(dates) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class SnapshotRecorder:
+    def __init__(self, every_days: int = 7):
+        self.every = pd.Timedelta(days=every_days)
+        self.next_at: Optional[pd.Timestamp] = None
+        self.dirty: Set[int] = set()
+        self.last_match: Dict[int, pd.Timestamp] = {}
+
+        self._pids: List[int] = []
+        self._dates: List[pd.Timestamp] = []
+        self._last: List[pd.Timestamp] = []
+        self._rows: List[tuple] = []
+
+        # log de deltas: estado después de cada partido
+        self._delta_pids: List[int] = []
+        self._delta_dates: List[pd.Timestamp] = []
+        self._delta_rows: List[tuple] = []
+
+    def record_match(self, pid: int, date: pd.Timestamp, row: tuple) -> None:
+        """Estado de `pid` después de su partido del main draw con fecha `date`."""
+        self.dirty.add(pid)
+        self.last_match[pid] = date
+        self._delta_pids.append(pid)
+        self._delta_dates.append(date)
+        self._delta_rows.append(row)
+
+    def maybe_snapshot(self, date: pd.Timestamp, state: Callable[[int], tuple]) -> None:
+        """Llamar antes de procesar los partidos de `date` (stream cronológico)."""
+        if self.next_at is None:
+            self.next_at = date
+        if date < self.next_at:
+            return
+        self.snapshot(date, state)
+        self.next_at = date + self.every
+
+    def snapshot(self, date: pd.Timestamp, state: Callable[[int], tuple]) -> None:
+        for pid in sorted(self.dirty):
+            self._pids.append(pid)
+            self._dates.append(date)
+            self._last.append(self.last_match[pid])
+            self._rows.append(state(pid))
+        self.dirty.clear()
+
+    def to_index(self) -> "SnapshotIndex":
+        return SnapshotIndex(
+            player_id=np.array(self._pids, dtype=np.int64),
+            day=_days(pd.DatetimeIndex(self._dates)),
+            last_day=_days(pd.DatetimeIndex(self._last)),
+            columns=_columns(self._rows),
+            delta_player_id=np.array(self._delta_pids, dtype=np.int64),
+            delta_day=_days(pd.DatetimeIndex(self._delta_dates)),
+            delta_columns=_columns(self._delta_rows),
+        )
+
+
+def _columns(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    values = np.array(rows, dtype=float).reshape(len(rows), len(SNAPSHOT_COLUMNS))
+    return {c: values[:, j] for j, c in enumerate(SNAPSHOT_COLUMNS)}
+
+
+class SnapshotIndex:
+    def __init__(
+        self,
+        player_id: np.ndarray,
+        day: np.ndarray,
+        last_day: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        delta_player_id: Optional[np.ndarray] = None,
+        delta_day: Optional[np.ndarray] = None,
+        delta_columns: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        order = np.lexsort((day, player_id))
+        self.player_id = player_id[order]
+        self.day = day[order]
+        self.last_day = last_day[order]
+        self.columns = {c: v[order] for c, v in columns.items()}
+        self._keys = player_day_keys(self.player_id, self.day)
+
+        if delta_player_id is None:
+            delta_player_id = np.empty(0, dtype=np.int64)
+            delta_day = np.empty(0, dtype=np.int64)
+            delta_columns = {c: np.empty(0) for c in self.columns}
+        # lexsort es estable: entre partidos del mismo día queda el último registrado
+        order = np.lexsort((delta_day, delta_player_id))
+        self.delta_player_id = delta_player_id[order]
+        self.delta_day = delta_day[order]
+        self.delta_columns = {c: v[order] for c, v in delta_columns.items()}
+        self._delta_keys = player_day_keys(self.delta_player_id, self.delta_day)
+
+    def __len__(self) -> int:
+        return len(self.player_id)
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            player_id=self.player_id,
+            day=self.day,
+            last_day=self.last_day,
+            delta_player_id=self.delta_player_id,
+            delta_day=self.delta_day,
+            **self.columns,
+            **{f"delta_{c}": v for c, v in self.delta_columns.items()},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "SnapshotIndex":
+        with np.load(path) as z:
+            cols = {c: z[c] for c in SNAPSHOT_COLUMNS if c in z.files}
+            if "delta_player_id" not in z.files:
+                return cls(z["player_id"], z["day"], z["last_day"], cols)
+            deltas = {c: z[f"delta_{c}"] for c in cols}
+            return cls(z["player_id"], z["day"], z["last_day"], cols, z["delta_player_id"], z["delta_day"], deltas)
+
+    def as_of(self, player_ids: Iterable[int], date) -> pd.DataFrame:
+        """
+        Estado pre-match de cada jugador en `date` (escalar o array alineado
+        con player_ids). Jugadores sin snapshot previo quedan en NaN.
+        """
+        pids = np.asarray(player_ids if isinstance(player_ids, np.ndarray) else list(player_ids), dtype=np.int64)
+        days = np.broadcast_to(_days(date), pids.shape)
+
+        keys = player_day_keys(pids, days)
+        no_day = np.iinfo(np.int64).min
+
+        def locate(index_keys: np.ndarray, index_pids: np.ndarray, side: str) -> np.ndarray:
+            # posición de la última entrada del mismo jugador (-1 si no hay)
+            pos = np.searchsorted(index_keys, keys, side=side) - 1
+            ok = pos >= 0
+            ok[ok] = index_pids[pos[ok]] == pids[ok]
+            return np.where(ok, pos, -1)
+
+        def take(arr: np.ndarray, pos: np.ndarray, fill) -> np.ndarray:
+            res = np.full(pids.shape, fill, dtype=np.result_type(arr, np.asarray(fill)))
+            res[pos >= 0] = arr[pos[pos >= 0]]
+            return res
+
+        # snapshot con fecha <= date; delta (estado post-partido) con fecha < date
+        snap = locate(self._keys, self.player_id, "right")
+        delta = locate(self._delta_keys, self.delta_player_id, "left")
+        snap_day = take(self.day, snap, no_day)
+        delta_day = take(self.delta_day, delta, no_day)
+        use_delta = (delta >= 0) & (delta_day >= snap_day)
+        found = (snap >= 0) | use_delta
+        last_day = np.where(use_delta, delta_day, take(self.last_day, snap, no_day))
+
+        out = {
+            "player_id": pids,
+            "date": days.astype("datetime64[D]"),
+            "snapshot_date": snap_day.astype("datetime64[D]"),
+            "last_match": np.where(found, last_day, no_day).astype("datetime64[D]"),
+        }
+        for c, v in self.columns.items():
+            out[c] = np.where(use_delta, take(self.delta_columns[c], delta, np.nan), take(v, snap, np.nan))
+
+        # replay del decay por inactividad (el mismo que aplica el loop al volver a jugar)
+        rest = np.where(found, np.clip(days - last_day, 0, DECAY_TABLE_DAYS), 0)
+        factor = np.where(rest >= DECAY_START_DAYS, _DECAY[rest], 1.0)
+        for c in ELO_COLUMNS:
+            if c in out:
+                out[c] = ELO_BASE + (out[c] - ELO_BASE) * factor
+
+        return pd.DataFrame(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Consulta point-in-time sobre un snapshot index: estado de cada jugador antes de "
+        "sus partidos con fecha >= --date (snapshot más cercano + último partido previo + decay de Elo)."
+    )
+    ap.add_argument("path", type=Path)
+    ap.add_argument("--players", type=str, required=True, help="player_ids separados por coma")
+    ap.add_argument("--date", type=str, required=True, help="YYYY-MM-DD")
+    args = ap.parse_args()
+
+    index = SnapshotIndex.load(args.path)
+    pids = [int(p) for p in args.players.split(",") if p.strip()]
+    print(index.as_of(pids, np.datetime64(args.date)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
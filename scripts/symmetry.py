@@ -0,0 +1,79 @@
+"""
+symmetry.py
+
+Etapa vectorizada de swap P1/P2.
+
+El loop online guarda las features del lado ganador y del lado perdedor
+(columnas w / l). Acá se decide la orientación de cada fila con una sola
+llamada al RNG y se arman las columnas P1/P2, los *_diff y el target como
+operaciones de arrays.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Tipos de columna de salida:
+#   ctx  -> columna de contexto, se copia
+#   y    -> target (1 si P1 es el ganador)
+#   p1   -> valor del lado P1
+#   p2   -> valor del lado P2
+#   diff -> P1 - P2 (NaN si algún lado es NaN)
+#   pair -> feature del par en orientación ganador-vs-perdedor; se invierte el signo si P1 es el perdedor
+OutputSpec = Sequence[Tuple[str, str, str]]
+
+
+def entry_strings(values) -> np.ndarray:
+    """Tipo de entrada (Q, WC, LL, ...) como string, "NONE" si falta."""
+    s = pd.Series(values, dtype=object)
+    return s.where(s.isna(), s.astype(str)).fillna("NONE").to_numpy(dtype=object)
+
+
+def orientations(n: int, seed: int, mirror: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Índice de partido y máscara "P1 es el ganador" para cada fila de salida.
+    Con mirror=True cada partido sale dos veces (ganador como P1 y como P2),
+    sin volver a correr el loop online.
+    """
+    if mirror:
+        return np.repeat(np.arange(n), 2), np.tile([True, False], n)
+
+    rng = np.random.default_rng(seed)
+    return np.arange(n), rng.random(n) < 0.5
+
+
+def symmetrize(
+    spec: OutputSpec,
+    context: Dict[str, np.ndarray],
+    winner: Dict[str, np.ndarray],
+    loser: Dict[str, np.ndarray],
+    pair: Dict[str, np.ndarray],
+    idx: np.ndarray,
+    p1_is_winner: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {}
+
+    for col, kind, src in spec:
+        if kind == "ctx":
+            out[col] = context[src][idx]
+        elif kind == "y":
+            out[col] = p1_is_winner.astype(np.int64)
+        elif kind == "pair":
+            v = pair[src][idx]
+            out[col] = np.where(p1_is_winner, v, 0 - v)
+        else:
+            w = winner[src][idx]
+            l = loser[src][idx]
+            if kind == "p1":
+                out[col] = np.where(p1_is_winner, w, l)
+            elif kind == "p2":
+                out[col] = np.where(p1_is_winner, l, w)
+            elif kind == "diff":
+                out[col] = np.where(p1_is_winner, w - l, l - w)
+            else:
+                raise ValueError(f"Tipo de columna desconocido: {kind!r}")
+
+    return out
@@ -0,0 +1,429 @@
+"""
+synthetic.py
+
+Generador de datos sintéticos con el mismo esquema que JeffSackmann/tennis_atp:
+atp_matches_YYYY.csv, atp_rankings_XXs.csv y atp_players.csv.
+
+Sirve para medir cómo escala el pipeline (build_dataset, rank_delta_weeks,
+trackers de features) con volúmenes tipo Challenger/ITF, 10-50x el histórico
+ATP. Cantidad de jugadores, partidos por año, duración de carrera y faltantes
+en las columnas de stats son configurables.
+
+Modelo (simple, pero con la estructura que usan las features):
+- cada jugador tiene una carrera [inicio, fin], un skill base con random walk
+  anual y una afinidad por superficie
+- torneos semanales de eliminación directa (G=128, M=64, A=32); en cada semana
+  los jugadores activos se reparten entre los torneos, los mejores en los de
+  mayor nivel
+- el ganador de cada partido sale de la probabilidad Elo entre skills
+- rankings semanales por skill + ruido, top `rank_depth`
+
+Uso:
+    python synthetic.py --out-dir ../data/raw/synthetic --players 20000 --matches-per-year 60000
+    python build_dataset.py --raw-dir ../data/raw/synthetic --year-from 2000 --year-to 2024
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils import DATA_DIR
+
+SYNTHETIC_DIR = DATA_DIR / "raw" / "synthetic"
+
+MATCH_COLUMNS = [
+    "tourney_id", "tourney_name", "surface", "draw_size", "tourney_level", "tourney_date", "match_num",
+    "winner_id", "winner_seed", "winner_entry", "winner_name", "winner_hand", "winner_ht", "winner_ioc", "winner_age",
+    "loser_id", "loser_seed", "loser_entry", "loser_name", "loser_hand", "loser_ht", "loser_ioc", "loser_age",
+    "score", "best_of", "round", "minutes",
+    "w_ace", "w_df", "w_svpt", "w_1stIn", "w_1stWon", "w_2ndWon", "w_SvGms", "w_bpSaved", "w_bpFaced",
+    "l_ace", "l_df", "l_svpt", "l_1stIn", "l_1stWon", "l_2ndWon", "l_SvGms", "l_bpSaved", "l_bpFaced",
+    "winner_rank", "winner_rank_points", "loser_rank", "loser_rank_points",
+]
+STAT_COLUMNS = ["ace", "df", "svpt", "1stIn", "1stWon", "2ndWon", "SvGms", "bpSaved", "bpFaced"]
+
+PLAYER_ID_BASE = 300000
+
+# nivel -> (tamaño del cuadro, best_of, fracción de los partidos del año)
+LEVELS = {
+    "G": (128, 5, 0.15),
+    "M": (64, 3, 0.25),
+    "A": (32, 3, 0.60),
+}
+ROUNDS = ["R128", "R64", "R32", "R16", "QF", "SF", "F"]
+
+SURFACE_WEIGHTS = {"Hard": 0.55, "Clay": 0.30, "Grass": 0.12, "Carpet": 0.03}
+HAND_LEFT = 0.12
+IOCS = np.array(["ARG", "AUS", "ESP", "FRA", "GER", "ITA", "USA", "SRB", "RUS", "GBR", "CHI", "JPN"])
+
+WEEKS_PER_YEAR = 50
+
+
+@dataclass
+class SyntheticConfig:
+    year_from: int = 2000
+    year_to: int = 2024
+    n_players: int = 5000
+    matches_per_year: int = 3000
+    career_years: float = 8.0  # media de una exponencial (mínimo 1 año)
+    stat_missing: float = 0.04  # fracción de partidos sin stats de saque
+    minutes_missing: float = 0.04
+    rank_missing: float = 0.01  # rank del match file faltante (además de los fuera del top)
+    player_missing: float = 0.01  # dob / height faltantes en atp_players
+    rank_depth: int = 2000
+    seed: int = 0
+
+
+def _mondays(year: int, weeks: int) -> pd.DatetimeIndex:
+    first = pd.Timestamp(year=year, month=1, day=1)
+    first += pd.Timedelta(days=(7 - first.weekday()) % 7)
+    return pd.DatetimeIndex([first + pd.Timedelta(weeks=w) for w in range(weeks)])
+
+
+def _yyyymmdd(dates) -> np.ndarray:
+    return pd.DatetimeIndex(dates).strftime("%Y%m%d").astype(int).to_numpy()
+
+
+def _score_pool(rng: np.random.Generator, sets: int, size: int = 256) -> np.ndarray:
+    """Scores plausibles (desde el lado del ganador) con `sets` sets jugados."""
+    wins_needed = sets // 2 + 1
+    pool = []
+    for _ in range(size):
+        # el ganador gana el último set y wins_needed - 1 de los anteriores
+        lost = set(rng.choice(sets - 1, size=sets - wins_needed, replace=False).tolist())
+        parts = []
+        for s in range(sets):
+            loser_games = int(rng.integers(0, 7))
+            if loser_games >= 5:
+                a, b = (7, loser_games) if loser_games == 5 else (7, 6)
+                part = f"{a}-{b}" + (f"({int(rng.integers(0, 8))})" if b == 6 else "")
+                rev = f"{b}-{a}" + (f"({int(rng.integers(0, 8))})" if b == 6 else "")
+            else:
+                part, rev = f"6-{loser_games}", f"{loser_games}-6"
+            parts.append(rev if s in lost else part)
+        pool.append(" ".join(parts))
+    return np.array(pool, dtype=object)
+
+
+class _Generator:
+    def __init__(self, cfg: SyntheticConfig):
+        if cfg.year_to < cfg.year_from:
+            raise ValueError("year_to < year_from")
+        self.cfg = cfg
+        self.rng = np.random.default_rng(cfg.seed)
+        self.years = np.arange(cfg.year_from, cfg.year_to + 1)
+        self._make_players()
+
+        self.scores = {
+            (bo, s): _score_pool(self.rng, s)
+            for bo in (3, 5)
+            for s in range(bo // 2 + 1, bo + 1)
+        }
+
+    def _make_players(self) -> None:
+        cfg, rng = self.cfg, self.rng
+        n = cfg.n_players
+
+        self.pid = PLAYER_ID_BASE + np.arange(n, dtype=np.int64)
+        career = np.maximum(1, np.round(rng.exponential(cfg.career_years, n))).astype(np.int64)
+        self.start = rng.integers(cfg.year_from - career + 1, cfg.year_to + 1)
+        self.end = self.start + career - 1
+
+        first_year = self.start - rng.integers(17, 23, n)
+        self.dob = pd.to_datetime(first_year.astype(str), format="%Y") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+        self.hand = np.where(rng.random(n) < HAND_LEFT, "L", "R").astype(object)
+        self.height = np.round(rng.normal(186, 7, n))
+        self.ioc = rng.choice(IOCS, n)
+        self.name = np.char.add("Synth ", self.pid.astype(str)).astype(object)
+
+        # skill por año (random walk sobre el skill base) + afinidad por superficie
+        base = rng.normal(1500, 200, n)
+        drift = np.cumsum(rng.normal(0, 40, (len(self.years), n)), axis=0)
+        self.skill = base[None, :] + drift
+        self.surface_skill = {s: rng.normal(0, 50, n) for s in SURFACE_WEIGHTS}
+
+    # ---- players ----
+
+    def players_frame(self) -> pd.DataFrame:
+        cfg, rng = self.cfg, self.rng
+        n = cfg.n_players
+        dob = pd.Series(_yyyymmdd(self.dob), dtype="Int64")
+        dob[rng.random(n) < cfg.player_missing] = pd.NA
+        height = pd.Series(self.height, dtype="Int64")
+        height[rng.random(n) < cfg.player_missing] = pd.NA
+        return pd.DataFrame({
+            "player_id": self.pid,
+            "name_first": "Synth",
+            "name_last": self.pid.astype(str),
+            "hand": self.hand,
+            "dob": dob,
+            "ioc": self.ioc,
+            "height": height,
+            "wikidata_id": "",
+        })
+
+    # ---- un año ----
+
+    def year(self, y: int):
+        """(partidos, rankings) del año y."""
+        cfg, rng = self.cfg, self.rng
+        yi = y - cfg.year_from
+        skill = self.skill[yi]
+        active = np.flatnonzero((self.start <= y) & (self.end >= y))
+        weeks = _mondays(y, WEEKS_PER_YEAR)
+
+        ranks, rank_file = self._rankings(active, skill, weeks)
+
+        # torneos del año, repartidos parejo entre semanas
+        levels: List[str] = []
+        for lvl, (draw, _, share) in LEVELS.items():
+            levels += [lvl] * max(1, int(round(cfg.matches_per_year * share / (draw - 1))))
+        levels = np.array(levels, dtype=object)
+        n_t = len(levels)
+        week = rng.permutation(n_t) % WEEKS_PER_YEAR
+        order = np.lexsort((np.array([list(LEVELS).index(l) for l in levels]), week))
+        levels, week = levels[order], week[order]
+        draw = np.array([LEVELS[l][0] for l in levels])
+        surfaces = rng.choice(list(SURFACE_WEIGHTS), n_t, p=list(SURFACE_WEIGHTS.values()))
+
+        # entrantes: por semana, los activos sorteados se ordenan por skill con ruido
+        # y llenan primero los torneos de mayor nivel (sin repetir jugador en la semana)
+        entrants: List[np.ndarray] = [None] * n_t
+        pos = np.full(cfg.n_players, -1)
+        pos[active] = np.arange(len(active))
+        for w in range(WEEKS_PER_YEAR):
+            ts = np.flatnonzero(week == w)
+            if not len(ts):
+                continue
+            slots = int(draw[ts].sum())
+            if slots > len(active):
+                raise ValueError(
+                    f"{y}: {slots} lugares en la semana {w} y solo {len(active)} jugadores activos; "
+                    "subí n_players o bajá matches_per_year"
+                )
+            cand = rng.choice(active, slots, replace=False)
+            cand = cand[np.argsort(-(skill[cand] + rng.normal(0, 150, slots)), kind="stable")]
+            offsets = np.concatenate([[0], np.cumsum(draw[ts])])
+            for k, t in enumerate(ts):
+                entrants[t] = rng.permutation(cand[offsets[k]:offsets[k + 1]])
+
+        # cuadros de eliminación directa, vectorizados por tamaño de cuadro
+        rows: Dict[str, List[np.ndarray]] = {k: [] for k in ("t", "w", "l", "round", "num")}
+        for d in np.unique(draw):
+            ts = np.flatnonzero(draw == d)
+            field = np.stack([entrants[t] for t in ts])
+            tcol = np.repeat(ts[:, None], d // 2, axis=1)
+            surf_bonus = np.stack([self.surface_skill[surfaces[t]] for t in ts])
+            row = np.arange(len(ts))[:, None]
+            n_rounds = int(np.log2(d))
+            num = 0
+            for r in range(n_rounds):
+                a, b = field[:, 0::2], field[:, 1::2]
+                sa = skill[a] + surf_bonus[row, a]
+                sb = skill[b] + surf_bonus[row, b]
+                a_wins = rng.random(a.shape) < 1.0 / (1.0 + 10 ** ((sb - sa) / 400))
+                win, lose = np.where(a_wins, a, b), np.where(a_wins, b, a)
+                m = a.shape[1]
+                rows["t"].append(tcol[:, :m].ravel())
+                rows["w"].append(win.ravel())
+                rows["l"].append(lose.ravel())
+                rows["round"].append(np.full(win.size, ROUNDS[len(ROUNDS) - n_rounds + r], dtype=object))
+                rows["num"].append(np.tile(num + 1 + np.arange(m), len(ts)))
+                num += m
+                field = win
+        t = np.concatenate(rows["t"])
+        w = np.concatenate(rows["w"])
+        l = np.concatenate(rows["l"])
+        rnd = np.concatenate(rows["round"])
+        num = np.concatenate(rows["num"])
+
+        # seeds: cuarto superior del cuadro por ranking de la semana
+        w_rank = ranks[pos[w], week[t]].astype(float)
+        l_rank = ranks[pos[l], week[t]].astype(float)
+        seed_of = self._seeds(entrants, ranks, pos, week)
+        df = self._match_frame(y, t, w, l, rnd, num, levels, surfaces, draw, weeks[week], w_rank, l_rank, seed_of)
+        return df, rank_file
+
+    def _rankings(self, active: np.ndarray, skill: np.ndarray, weeks: pd.DatetimeIndex):
+        """Rank de cada activo por semana (matriz activos x semanas) y el archivo top rank_depth."""
+        cfg, rng = self.cfg, self.rng
+        score = skill[active][:, None] + np.cumsum(rng.normal(0, 8, (len(active), len(weeks))), axis=1)
+        order = np.argsort(-score, axis=0, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(1, len(active) + 1)[:, None], axis=0)
+
+        depth = min(cfg.rank_depth, len(active))
+        top = order[:depth]  # (depth, semanas)
+        rank_file = pd.DataFrame({
+            "ranking_date": np.repeat(_yyyymmdd(weeks), depth),
+            "rank": np.tile(np.arange(1, depth + 1), len(weeks)),
+            "player": self.pid[active][top.T.ravel()],
+            "points": np.tile(_points(np.arange(1, depth + 1)), len(weeks)),
+        })
+        return ranks, rank_file
+
+    def _seeds(self, entrants, ranks, pos, week):
+        """Claves ordenadas torneo * n_players + jugador de los cabezas de serie, y su seed."""
+        keys, vals = [], []
+        for t, e in enumerate(entrants):
+            top = e[np.argsort(ranks[pos[e], week[t]], kind="stable")[: len(e) // 4]]
+            keys.append(t * self.cfg.n_players + top)
+            vals.append(np.arange(1, len(top) + 1))
+        keys, vals = np.concatenate(keys), np.concatenate(vals)
+        order = np.argsort(keys)
+        return keys[order], vals[order]
+
+    def _match_frame(self, y, t, w, l, rnd, num, levels, surfaces, draw, dates, w_rank, l_rank, seed_of) -> pd.DataFrame:
+        cfg, rng = self.cfg, self.rng
+        n = len(t)
+        best_of = np.array([LEVELS[lv][1] for lv in levels])[t]
+        date = pd.DatetimeIndex(dates[t])
+
+        # sets jugados y score
+        sets = np.where(
+            best_of == 5,
+            rng.choice([3, 4, 5], n, p=[0.4, 0.35, 0.25]),
+            rng.choice([2, 3], n, p=[0.65, 0.35]),
+        )
+        score = np.empty(n, dtype=object)
+        for (bo, s), pool in self.scores.items():
+            m = (best_of == bo) & (sets == s)
+            score[m] = pool[rng.integers(0, len(pool), m.sum())]
+
+        # stats de saque (ganador un poco mejor al saque que el perdedor)
+        games = sets * rng.integers(8, 12, n)
+        stats = {}
+        for side, first_won, second_won, bp_faced, bp_saved in (("w", 0.75, 0.55, 3.0, 0.66), ("l", 0.68, 0.48, 7.0, 0.58)):
+            sv_gms = (games + (1 if side == "w" else 0)) // 2
+            svpt = rng.poisson(sv_gms * 6.2)
+            first_in = rng.binomial(svpt, 0.62)
+            faced = rng.poisson(bp_faced * sets / 2.5)
+            stats[side] = {
+                "ace": rng.binomial(first_in, 0.12),
+                "df": rng.binomial(svpt - first_in, 0.09),
+                "svpt": svpt,
+                "1stIn": first_in,
+                "1stWon": rng.binomial(first_in, first_won),
+                "2ndWon": rng.binomial(svpt - first_in, second_won),
+                "SvGms": sv_gms,
+                "bpSaved": rng.binomial(faced, bp_saved),
+                "bpFaced": faced,
+            }
+        minutes = np.round((stats["w"]["svpt"] + stats["l"]["svpt"]) * 0.7 + rng.normal(0, 10, n))
+
+        # faltantes: partidos enteros sin stats (como en Sackmann) y minutos sueltos
+        no_stats = rng.random(n) < cfg.stat_missing
+        minutes = np.where(no_stats | (rng.random(n) < cfg.minutes_missing), np.nan, np.maximum(minutes, 20))
+
+        out = {
+            "tourney_id": np.char.add(f"{y}-S", np.char.zfill(t.astype(str), 4)),
+            "tourney_name": np.char.add("Synthetic ", t.astype(str)),
+            "surface": surfaces[t],
+            "draw_size": draw[t],
+            "tourney_level": levels[t],
+            "tourney_date": _yyyymmdd(date),
+            "match_num": num,
+        }
+        for side, ids, rank in (("winner", w, w_rank), ("loser", l, l_rank)):
+            seed = _lookup_seed(seed_of, t * cfg.n_players + ids)
+            entry = rng.choice(np.array(["", "Q", "WC", "LL"], dtype=object), n, p=[0.9, 0.06, 0.03, 0.01])
+            rank = np.where((rank > cfg.rank_depth) | (rng.random(n) < cfg.rank_missing), np.nan, rank)
+            out.update({
+                f"{side}_id": self.pid[ids],
+                f"{side}_seed": seed,
+                f"{side}_entry": np.where(np.isnan(seed), entry, ""),
+                f"{side}_name": self.name[ids],
+                f"{side}_hand": self.hand[ids],
+                f"{side}_ht": self.height[ids],
+                f"{side}_ioc": self.ioc[ids],
+                f"{side}_age": np.round((date - self.dob[ids]).days.to_numpy() / 365.25, 1),
+                f"{side}_rank": rank,
+                f"{side}_rank_points": np.where(np.isnan(rank), np.nan, _points(np.nan_to_num(rank, nan=1))),
+            })
+        out.update({"score": score, "best_of": best_of, "round": rnd, "minutes": minutes})
+        for side in ("w", "l"):
+            for c in STAT_COLUMNS:
+                out[f"{side}_{c}"] = np.where(no_stats, np.nan, stats[side][c])
+
+        df = pd.DataFrame(out)[MATCH_COLUMNS]
+        df = df.sort_values(["tourney_date", "tourney_id", "match_num"], kind="mergesort")
+        return df.reset_index(drop=True)
+
+
+def _lookup_seed(seeds, keys: np.ndarray) -> np.ndarray:
+    sorted_keys, vals = seeds
+    i = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[i] == keys, vals[i], np.nan)
+
+
+def _points(rank: np.ndarray) -> np.ndarray:
+    return np.round(12000 * np.asarray(rank, dtype=float) ** -0.9).astype(np.int64)
+
+
+def generate(cfg: SyntheticConfig, out_dir: Path = SYNTHETIC_DIR) -> Dict[str, int]:
+    """Escribe los CSV en out_dir; devuelve conteos (partidos, filas de rankings, jugadores)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    gen = _Generator(cfg)
+
+    n_matches = 0
+    rank_parts: Dict[str, List[pd.DataFrame]] = {}
+    for y in gen.years.tolist():
+        df, ranks = gen.year(y)
+        df.to_csv(out_dir / f"atp_matches_{y}.csv", index=False)
+        n_matches += len(df)
+        rank_parts.setdefault(f"{y // 10 * 10 % 100:02d}s", []).append(ranks)
+
+    n_ranks = 0
+    for decade, parts in rank_parts.items():
+        r = pd.concat(parts, ignore_index=True)
+        r.to_csv(out_dir / f"atp_rankings_{decade}.csv", index=False)
+        n_ranks += len(r)
+
+    players = gen.players_frame()
+    players.to_csv(out_dir / "atp_players.csv", index=False)
+    return {"matches": n_matches, "rankings": n_ranks, "players": len(players)}
+
+
+def main() -> None:
+    d = SyntheticConfig()
+    ap = argparse.ArgumentParser(description="Genera datos sintéticos con el esquema de tennis_atp.")
+    ap.add_argument("--out-dir", type=Path, default=SYNTHETIC_DIR)
+    ap.add_argument("--year-from", type=int, default=d.year_from)
+    ap.add_argument("--year-to", type=int, default=d.year_to)
+    ap.add_argument("--players", type=int, default=d.n_players)
+    ap.add_argument("--matches-per-year", type=int, default=d.matches_per_year)
+    ap.add_argument("--career-years", type=float, default=d.career_years, help="Duración media de carrera (años).")
+    ap.add_argument("--stat-missing", type=float, default=d.stat_missing, help="Fracción de partidos sin stats de saque.")
+    ap.add_argument("--minutes-missing", type=float, default=d.minutes_missing)
+    ap.add_argument("--rank-missing", type=float, default=d.rank_missing)
+    ap.add_argument("--player-missing", type=float, default=d.player_missing)
+    ap.add_argument("--rank-depth", type=int, default=d.rank_depth)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    args = ap.parse_args()
+
+    cfg = SyntheticConfig(
+        year_from=args.year_from,
+        year_to=args.year_to,
+        n_players=args.players,
+        matches_per_year=args.matches_per_year,
+        career_years=args.career_years,
+        stat_missing=args.stat_missing,
+        minutes_missing=args.minutes_missing,
+        rank_missing=args.rank_missing,
+        player_missing=args.player_missing,
+        rank_depth=args.rank_depth,
+        seed=args.seed,
+    )
+    counts = generate(cfg, args.out_dir)
+    print(f"{args.out_dir}: {counts['matches']} partidos, {counts['rankings']} filas de rankings, {counts['players']} jugadores")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ import pandas as pd
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = PROJECT_ROOT / "data"
-RAW_ATP_DIR = DATA_DIR / "raw" / "atp"
+RAW_DIR = DATA_DIR / "raw"
+RAW_ATP_DIR = RAW_DIR / "atp"
 PROCESSED_DIR = DATA_DIR / "processed"
 
 
@@ -40,8 +41,24 @@ def mean_last(values, n: int, default: float) -> float:
     return float(np.mean(tail)) if tail else default
 
 
-def load_players_lookup() -> dict[int, dict]:
-    p = RAW_ATP_DIR / "atp_players.csv"
+# Clave compuesta (player_id, día desde epoch) en un int64, para búsquedas vectorizadas
+# con un solo searchsorted (índice de rankings y de snapshots). Ordenar por la clave
+# ordena por jugador y, dentro del jugador, por fecha.
+KEY_DAY_BITS = 20
+_KEY_DAY_OFFSET = 1 << (KEY_DAY_BITS - 1)
+
+
+def player_day_keys(pids: np.ndarray, days: np.ndarray) -> np.ndarray:
+    return (np.asarray(pids).astype(np.int64) << KEY_DAY_BITS) + (np.asarray(days).astype(np.int64) + _KEY_DAY_OFFSET)
+
+
+def key_player(keys: np.ndarray) -> np.ndarray:
+    """player_id de una clave de player_day_keys."""
+    return keys >> KEY_DAY_BITS
+
+
+def load_players_lookup(raw_dir: Path = RAW_ATP_DIR, players_file: str = "atp_players.csv") -> dict[int, dict]:
+    p = raw_dir / players_file
     df = pd.read_csv(p, low_memory=False)
 
     # dob viene como YYYYMMDD en Sackmann; parse_yyyymmdd ya existe
@@ -0,0 +1,235 @@
+"""
+validation.py
+
+Validación columnar de calidad de datos en la ingesta (load_matches / load_rankings).
+
+Cada regla es una máscara vectorizada sobre la tabla completa:
+- "nullify": el valor es imposible pero la fila es válida; las columnas de la
+  regla pasan a NaN. Ej: 1stIn > svpt invalida todas las stats de saque de ese
+  lado, que si no entran a rates_from_row y sesgan los rolling stats.
+- "drop": la fila en sí no tiene sentido (winner == loser, duplicados) y se descarta.
+
+ValidationReport acumula los conteos por regla y, si se pide, las filas
+originales en cuarentena con las reglas que violan (para revisarlas sin
+volver a leer los CSV).
+
+    python validation.py --year-from 2000 --year-to 2024 --quarantine ../data/processed/quarantine.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SERVE_STATS = ("ace", "df", "svpt", "1stIn", "1stWon", "2ndWon", "SvGms", "bpSaved", "bpFaced")
+
+NULLIFY = "nullify"
+DROP = "drop"
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    action: str  # NULLIFY / DROP
+    check: Callable[[pd.DataFrame], np.ndarray]  # máscara de filas que violan la regla
+    columns: Tuple[str, ...] = ()  # columnas que pasan a NaN (NULLIFY)
+    description: str = ""
+
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def _serve_rules(side: str) -> List[Rule]:
+    p = f"{side}_"
+    cols = tuple(p + c for c in SERVE_STATS)
+
+    def gt(a: str, b: str) -> Callable[[pd.DataFrame], np.ndarray]:
+        return lambda df: _num(df, p + a) > _num(df, p + b)
+
+    def negative(df: pd.DataFrame) -> np.ndarray:
+        return (np.column_stack([_num(df, c) for c in cols]) < 0).any(axis=1)
+
+    def second_won(df: pd.DataFrame) -> np.ndarray:
+        return _num(df, p + "2ndWon") > _num(df, p + "svpt") - _num(df, p + "1stIn")
+
+    return [
+        Rule(f"{p}negative_stats", NULLIFY, negative, cols, "algún conteo de saque negativo"),
+        Rule(f"{p}1stIn_gt_svpt", NULLIFY, gt("1stIn", "svpt"), cols, "1stIn > svpt"),
+        Rule(f"{p}1stWon_gt_1stIn", NULLIFY, gt("1stWon", "1stIn"), cols, "1stWon > 1stIn"),
+        Rule(f"{p}2ndWon_gt_2nd_serves", NULLIFY, second_won, cols, "2ndWon > svpt - 1stIn"),
+        Rule(f"{p}ace_gt_svpt", NULLIFY, gt("ace", "svpt"), cols, "ace > svpt"),
+        Rule(f"{p}df_gt_svpt", NULLIFY, gt("df", "svpt"), cols, "df > svpt"),
+        Rule(f"{p}bpSaved_gt_bpFaced", NULLIFY, gt("bpSaved", "bpFaced"), cols, "bpSaved > bpFaced"),
+    ]
+
+
+MATCH_RULES: List[Rule] = [
+    Rule("minutes_negative", NULLIFY, lambda df: _num(df, "minutes") < 0, ("minutes",), "minutes < 0"),
+    *_serve_rules("w"),
+    *_serve_rules("l"),
+    Rule(
+        "same_player",
+        DROP,
+        lambda df: df["winner_id"].to_numpy() == df["loser_id"].to_numpy(),
+        description="winner_id == loser_id",
+    ),
+    Rule("duplicate_row", DROP, lambda df: df.duplicated().to_numpy(), description="fila idéntica a una anterior"),
+]
+
+# columnas crudas de atp_rankings_*.csv (antes del rename de load_rankings)
+RANKING_RULES: List[Rule] = [
+    Rule("rank_nonpositive", DROP, lambda df: _num(df, "rank") <= 0, description="rank <= 0"),
+    Rule("points_negative", NULLIFY, lambda df: _num(df, "points") < 0, ("points",), "points < 0"),
+    Rule(
+        "duplicate_ranking",
+        DROP,
+        lambda df: df.duplicated(["ranking_date", "player"]).to_numpy(),
+        description="(ranking_date, player) repetido; se queda el primero",
+    ),
+]
+
+
+class ValidationReport:
+    """Conteos por (tabla, regla) y, con keep_rows=True, las filas originales en cuarentena."""
+
+    def __init__(self, keep_rows: bool = False):
+        self.keep_rows = keep_rows
+        self.rows: Dict[str, int] = {}
+        self.counts: Dict[Tuple[str, str], int] = {}
+        # (tabla, regla) -> (action, description); sin los checks, para que el reporte sea picklable
+        self.rules: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._quarantine: List[pd.DataFrame] = []
+
+    def record(self, table: str, df: pd.DataFrame, rules: Iterable[Rule], masks: Dict[str, np.ndarray]) -> None:
+        self.rows[table] = self.rows.get(table, 0) + len(df)
+        for r in rules:
+            key = (table, r.name)
+            self.rules[key] = (r.action, r.description)
+            self.counts[key] = self.counts.get(key, 0) + int(masks[r.name].sum())
+
+        if not self.keep_rows:
+            return
+        hit = [r.name for r in rules if masks[r.name].any()]
+        if not hit:
+            return
+        any_bad = np.logical_or.reduce([masks[name] for name in hit])
+        labels = pd.Series("", index=df.index)
+        for name in hit:
+            labels[masks[name]] += name + ";"
+        q = df[any_bad].copy()
+        q.insert(0, "rules", labels[any_bad].str.rstrip(";"))
+        q.insert(0, "table", table)
+        self._quarantine.append(q)
+
+    def extend(self, other: "ValidationReport") -> None:
+        for t, n in other.rows.items():
+            self.rows[t] = self.rows.get(t, 0) + n
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.rules.update(other.rules)
+        self._quarantine += other._quarantine
+
+    @property
+    def violations(self) -> int:
+        return sum(self.counts.values())
+
+    def to_frame(self) -> pd.DataFrame:
+        out = [
+            {
+                "table": table,
+                "rule": name,
+                "action": self.rules[(table, name)][0],
+                "violations": n,
+                "pct": round(100.0 * n / max(self.rows.get(table, 0), 1), 4),
+                "description": self.rules[(table, name)][1],
+            }
+            for (table, name), n in self.counts.items()
+        ]
+        return pd.DataFrame(out, columns=["table", "rule", "action", "violations", "pct", "description"])
+
+    def quarantine(self) -> pd.DataFrame:
+        if not self._quarantine:
+            return pd.DataFrame(columns=["table", "rules"])
+        return pd.concat(self._quarantine, ignore_index=True, sort=False)
+
+    def write_quarantine(self, path: Path) -> int:
+        q = self.quarantine()
+        q.to_csv(path, index=False)
+        return len(q)
+
+    def summary(self, only_violations: bool = True) -> str:
+        rows = ", ".join(f"{t}: {n}" for t, n in self.rows.items())
+        f = self.to_frame()
+        if only_violations:
+            f = f[f["violations"] > 0]
+        head = f"Validación ({rows} filas): {self.violations} violaciones"
+        return head if f.empty else head + "\n" + f.to_string(index=False)
+
+
+def apply_rules(df: pd.DataFrame, rules: List[Rule], table: str, report: Optional[ValidationReport] = None) -> pd.DataFrame:
+    """Evalúa todas las reglas sobre la tabla original, anula los valores inválidos y descarta las filas rotas."""
+    masks = {r.name: np.asarray(r.check(df), dtype=bool) for r in rules}
+    if report is not None:
+        report.record(table, df, rules, masks)
+
+    nullify = [r for r in rules if r.action == NULLIFY and masks[r.name].any()]
+    if nullify:
+        df = df.copy()
+        for r in nullify:
+            cols = [c for c in r.columns if c in df]
+            df[cols] = df[cols].astype(float)
+            df.loc[masks[r.name], cols] = np.nan
+
+    drop = [masks[r.name] for r in rules if r.action == DROP]
+    if drop:
+        bad = np.logical_or.reduce(drop)
+        if bad.any():
+            df = df[~bad]
+    return df
+
+
+def validate_matches(df: pd.DataFrame, report: Optional[ValidationReport] = None) -> pd.DataFrame:
+    return apply_rules(df, MATCH_RULES, "matches", report)
+
+
+def validate_rankings(df: pd.DataFrame, report: Optional[ValidationReport] = None) -> pd.DataFrame:
+    return apply_rules(df, RANKING_RULES, "rankings", report)
+
+
+def main() -> None:
+    from download import CIRCUITS, get_circuit, load_matches
+    from rankings import load_rankings
+
+    ap = argparse.ArgumentParser(description="Reporte de calidad de datos de partidos y rankings.")
+    ap.add_argument("--year-from", type=int, required=True)
+    ap.add_argument("--year-to", type=int, required=True)
+    ap.add_argument("--circuit", choices=sorted(CIRCUITS), default="atp")
+    ap.add_argument("--raw-dir", type=Path, default=None)
+    ap.add_argument("--no-rankings", action="store_true")
+    ap.add_argument("--quarantine", type=Path, default=None, help="CSV con las filas que violan alguna regla.")
+    args = ap.parse_args()
+
+    circuit = get_circuit(args.circuit)
+    raw_dir = args.raw_dir or circuit.raw_dir
+    report = ValidationReport(keep_rows=args.quarantine is not None)
+
+    load_matches(args.year_from, args.year_to, raw_dir=raw_dir, pattern=circuit.matches_pattern, report=report)
+    if not args.no_rankings:
+        load_rankings(args.year_from, args.year_to, raw_dir=raw_dir, prefix=circuit.rankings_prefix, report=report)
+
+    print(report.summary(only_violations=False))
+    if args.quarantine is not None:
+        n = report.write_quarantine(args.quarantine)
+        print(f"Cuarentena: {n} filas en {args.quarantine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Paridad del backend jit (fast_loop) contra el replay de referencia, sobre datos sintéticos."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from fast_loop import check_synthetic_parity  # noqa: E402
+
+
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "pure_python"])
+def test_replay_arrays_matches_reference(compiled):
+    assert check_synthetic_parity(compiled=compiled) == []
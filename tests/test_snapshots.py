@@ -0,0 +1,72 @@
+"""SnapshotIndex.as_of contra los valores pre-match del replay de referencia, sobre datos sintéticos."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from build_dataset import FEATURE_GROUPS, replay_online  # noqa: E402
+from download import load_matches  # noqa: E402
+from rankings import build_rank_hist, load_rankings  # noqa: E402
+from snapshots import SnapshotRecorder  # noqa: E402
+from synthetic import SyntheticConfig, generate  # noqa: E402
+from utils import load_players_lookup  # noqa: E402
+
+CFG = SyntheticConfig(year_from=2020, year_to=2021, n_players=300, matches_per_year=400, seed=3)
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    raw = tmp_path_factory.mktemp("synthetic")
+    generate(CFG, raw)
+    df = load_matches(CFG.year_from, CFG.year_to, raw_dir=raw)
+    rank_hist = build_rank_hist(load_rankings(CFG.year_from, CFG.year_to, raw_dir=raw))
+    return df, load_players_lookup(raw), rank_hist
+
+
+def _replay(tables, every_days, qual_rounds=()):
+    df, players, rank_hist = tables
+    is_qual = df["round"].isin(list(qual_rounds))
+    recorder = SnapshotRecorder(every_days)
+    cols = replay_online(
+        df[~is_qual].reset_index(drop=True),
+        df[is_qual].reset_index(drop=True),
+        players,
+        rank_hist,
+        set(FEATURE_GROUPS),
+        snapshots=recorder,
+    )
+    return cols, recorder.to_index()
+
+
+@pytest.mark.parametrize("every_days", [7, 30])
+def test_as_of_matches_replay_pre_match(tables, every_days):
+    (context, winner, loser, _), index = _replay(tables, every_days)
+    dates = np.asarray(context["date"], dtype="datetime64[D]")
+
+    # ambos lados intercalados en el orden del stream: fila 2i = winner, 2i+1 = loser
+    pids = np.column_stack([winner["id"], loser["id"]]).ravel()
+    days = np.repeat(dates, 2)
+    # primer partido de cada jugador en cada fecha (los siguientes ya ven las rondas previas)
+    first = ~pd.DataFrame({"pid": pids, "day": days}).duplicated().to_numpy()
+    got = index.as_of(pids[first], days[first])
+    # sin partidos previos el store no tiene fila (NaN); el replay usa los defaults
+    seen = got["last_match"].notna().to_numpy()
+    assert seen.sum() > len(seen) // 2
+    for c in ("elo", "wr10", "wr20", "streak", "ace_rate", "bp_saved_rate"):
+        expected = np.column_stack([winner[c], loser[c]]).astype(float).ravel()[first][seen]
+        np.testing.assert_allclose(got[c].to_numpy()[seen], expected, rtol=0, atol=1e-9, err_msg=c)
+
+
+def test_as_of_after_replay_with_qualies(tables):
+    (context, winner, _, _), index = _replay(tables, 7, qual_rounds=("R128",))
+    assert (index.last_day <= index.day).all()
+
+    dates = np.asarray(context["date"], dtype="datetime64[D]")
+    got = index.as_of(winner["id"], dates)
+    assert (got["last_match"].dropna() < got["date"][got["last_match"].notna()]).all()
+    assert np.isfinite(got["elo"].dropna()).all()